@@ -1,15 +1,85 @@
 # config/settings.py
 import logging
-from queue import Queue
-from typing import Dict
 
 # =============== KONFIGURÁCIÓS BEÁLLÍTÁSOK ===============
 BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"
 WEBAPP_URL = "https://e1d404acf189.ngrok-free.app"  # ha iPad/ngrok: "https://<valami>.ngrok-free.app"
 DB_NAME = "restaurant_orders.db"
 
+# Update fogadás módja: "polling" (alapértelmezett) vagy "webhook" (a Flask szerver fogadja, WEBAPP_URL alatt)
+BOT_MODE = "polling"
+WEBHOOK_PATH = "/telegram/webhook"
+WEBHOOK_SECRET = ""  # Telegram secret_token; üresen hagyva induláskor véletlen titok készül
+
+# Update feldolgozás: különböző chatek párhuzamosan, egy chaten belül szigorúan sorrendben
+BOT_CONCURRENT_UPDATES = 32     # egyszerre ennyi update handler futhat
+BOT_MAX_PENDING_UPDATES = 1024  # ennyi update várakozhat (sávban vagy szabad helyre), utána visszatartja a fogadást
+
+# =============== ADATBÁZIS KAPCSOLAT BEÁLLÍTÁSOK ===============
+DB_POOL_SIZE = 8             # ennyi szabad kapcsolatot tartunk meg újrafelhasználásra
+DB_BUSY_TIMEOUT_MS = 5000    # zárolt adatbázis esetén ennyit vár írás előtt
+DB_CACHE_SIZE_KB = 16384     # kapcsolatonkénti page cache (KiB)
+DB_SYNCHRONOUS = "NORMAL"    # WAL módban biztonságos és jóval gyorsabb a FULL-nál
+DB_WRITE_BATCH_WINDOW_MS = 5 # a bot írásai ennyi ms-ig gyűlnek egy tranzakcióba
+DB_WRITE_BATCH_MAX = 100     # egy író körben legfeljebb ennyi művelet
+
 # Admin jogosultottak listája (Telegram user ID-k)
 ADMIN_USER_IDS = [7553912440]  # Itt add meg a saját Telegram user ID-d
+ADMIN_DELIVERIES_PAGE_SIZE = 500  # admin oldalon egy oldalnyi kézbesítés
+
+# =============== GEOKÓDOLÁS ===============
+GEOCODE_CACHE_TTL_DAYS = 90       # sikeres találat ennyi ideig érvényes az adatbázisban
+GEOCODE_NEGATIVE_TTL_HOURS = 6    # "nincs találat" rövidebb ideig (elírt cím javulhat, OSM frissülhet)
+GEOCODE_LRU_SIZE = 2048           # memóriában tartott címek száma
+NOMINATIM_RPS = 1.0               # Nominatim használati feltétel: max. 1 kérés / mp a teljes folyamatra
+GEOCODE_MAX_WORKERS = 4           # geocode_many párhuzamos lekérdezései (a keretet a rate limiter tartja)
+NOMINATIM_MAX_ATTEMPTS = 3        # 429 / 5xx / hálózati hiba esetén ennyi próbálkozás kérésenként
+NOMINATIM_BACKOFF_BASE = 2.0      # újrapróbálás előtti várakozás (mp), próbálkozásonként duplázódik
+NOMINATIM_BACKOFF_MAX = 60.0      # a Retry-After / visszalépés felső korlátja (mp)
+GEOCODE_RETRY_BASE_SECONDS = 30   # háttér geokódolás: elérhetetlen geokódoló után ennyi múlva újra (duplázódik)
+GEOCODE_RETRY_MAX_SECONDS = 1800
+GEOCODE_RETRY_LIMIT = 8           # ennyi sikertelen kör után feladja (a rendelést a következő induláskor újra próbálja)
+GAZETTEER_DB = "gazetteer.db"     # helyi címadatbázis (python main.py --import-gazetteer <csv>); ha nincs, csak Nominatim
+
+# =============== KÖZELI RENDELÉSEK ===============
+SPATIAL_CELL_DEG = 0.01           # térbeli index rácsmérete (~1 km)
+NEARBY_DEFAULT_RADIUS_KM = 5.0
+NEARBY_MAX_RADIUS_KM = 50.0
+NEARBY_DEFAULT_LIMIT = 20
+NEARBY_MAX_LIMIT = 100
+
+# =============== KIOSZTÁSI JAVASLATOK ===============
+DISPATCH_INTERVAL_SECONDS = 60    # ilyen gyakran számol új futár-rendelés párosítást
+DISPATCH_MAX_DISTANCE_KM = 5.0    # ennél messzebbi felvételi pontot nem javaslunk
+DISPATCH_ACTIVE_HOURS = 3         # az ennyi órán belül kiszállító, most szabad futárok kapnak javaslatot
+
+# =============== ÚTVONALTERVEZÉS ===============
+ROUTE_TIME_BUDGET_SECONDS = 0.5   # helyi keresés időkerete nagy (12+ címes) útvonalaknál
+
+# =============== ÉLŐ RENDELÉS FEED (SSE) ===============
+SSE_HEARTBEAT_SECONDS = 15    # ennyi csend után ping, hogy a proxyk ne bontsák a kapcsolatot
+SSE_SUBSCRIBER_QUEUE = 256    # kliensenkénti puffer; ha betelik, a kliens teljes újratöltést kap
+
+# =============== TELEGRAM ÉRTESÍTÉSEK ===============
+NOTIFY_GLOBAL_RATE = 25           # üzenet / mp a teljes botra (Telegram limit: ~30)
+NOTIFY_CHAT_RATE = 1.0            # üzenet / mp egy privát chatbe
+NOTIFY_GROUP_RATE_PER_MIN = 20    # üzenet / perc egy csoportba (Telegram limit)
+NOTIFY_MAX_CONCURRENCY = 16       # egyszerre folyamatban lévő küldések
+NOTIFY_MAX_RETRIES = 5
+NOTIFY_BACKOFF_BASE = 1.0         # átmeneti hibánál 1, 2, 4, ... mp várakozás
+NOTIFY_BACKOFF_MAX = 30.0
+NOTIFY_CLAIM_BATCH = 50           # egyszerre lefoglalt outbox sorok
+NOTIFY_MAX_IN_FLIGHT = 200        # ennyi lefoglalt, még ki nem küldött értesítés lehet a memóriában
+NOTIFY_POLL_INTERVAL = 0.5        # üres outboxnál ennyit vár a következő lekérdezésig (mp)
+NOTIFY_CLAIM_LEASE_SECONDS = 900  # lefoglalt, de le nem zárt sor ennyi idő után újra kiadható
+NOTIFY_OUTBOX_RETENTION_DAYS = 7  # kiküldött értesítések megőrzése
+NOTIFY_OUTBOX_RETRY_BASE = 60.0   # átmeneti hiba után az outbox sor 1, 2, 4, ... perc múlva kerül újra sorra
+NOTIFY_OUTBOX_RETRY_MAX = 3600.0
+NOTIFY_OUTBOX_MAX_ATTEMPTS = 8    # ennyi sikertelen lefoglalás után a sor végleg failed
+NOTIFY_COALESCE_WINDOW = 2.0      # egy chat ennyi mp-en belül érkező üzenetei egy összesítőbe kerülnek
+NOTIFY_COALESCE_MAX_DELAY = 8.0   # folyamatos érkezésnél is legkésőbb ennyi mp után kimegy az összesítő
+NOTIFY_MAX_MESSAGE_LEN = 4000     # Telegram korlát 4096 karakter - ennél hosszabb összesítő több részben megy
+NOTIFY_METRICS_LOG_SECONDS = 300  # értesítés metrikák naplózása (küldések, összevonással megspórolt küldések)
 
 # =============== LOGGING KONFIGURÁCIÓ ===============
 def setup_logging():
@@ -19,7 +89,3 @@ def setup_logging():
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     return logging.getLogger(__name__)
-
-# =============== GLOBÁLIS VÁLTOZÓK ===============
-# Értesítések sorban (pl. éttermi csoportnak visszaírás)
-notification_queue: "Queue[Dict]" = Queue()
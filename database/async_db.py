@@ -0,0 +1,142 @@
+# database/async_db.py
+import asyncio
+import logging
+import threading
+import time
+from queue import Queue, Empty
+from typing import Any, Dict, List, Optional
+
+from config.settings import DB_WRITE_BATCH_WINDOW_MS, DB_WRITE_BATCH_MAX
+from database.db_manager import DatabaseManager, db
+
+logger = logging.getLogger(__name__)
+
+class _Job:
+    """Egy sorba tett írási művelet és a hívó futureja"""
+    __slots__ = ("op", "args", "future", "loop", "settled")
+
+    def __init__(self, op: str, args: tuple, future: asyncio.Future, loop: asyncio.AbstractEventLoop) -> None:
+        self.op = op
+        self.args = args
+        self.future = future
+        self.loop = loop
+        self.settled = False  # az író szál már továbbította az eredményt / hibát
+
+class AsyncDatabase:
+    """
+    Awaitable adatbázis homlokzat az async bot handlerekhez: az írások egy dedikált író szálon futnak,
+    így a blokkoló commit / fsync nem állítja meg az event loopot.
+    A néhány ms-on belül (DB_WRITE_BATCH_WINDOW_MS) érkező rendelés mentések egy tranzakcióba kerülnek.
+    """
+
+    def __init__(self, database: DatabaseManager) -> None:
+        self.db = database
+        self._queue: "Queue[_Job]" = Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def _submit(self, op: str, *args: Any) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put(_Job(op, args, future, loop))
+        self._ensure_running()
+        return future
+
+    # =============== AWAITABLE API ===============
+    async def save_order(self, item: Dict) -> int:
+        """Rendelés mentése (kötegelve a közel egyszerre érkezőkkel); visszatérés: rendelés ID"""
+        return await self._submit("save_order", item)
+
+    async def register_group(self, group_id: int, group_name: str) -> None:
+        await self._submit("register_group", group_id, group_name)
+
+    async def set_group_address(self, group_id: int, address: str) -> None:
+        await self._submit("set_group_address", group_id, address)
+
+    # =============== ÍRÓ SZÁL ===============
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # rövid gyűjtési ablak: az ezalatt érkező írások ugyanabba a körbe kerülnek
+            deadline = time.monotonic() + DB_WRITE_BATCH_WINDOW_MS / 1000.0
+            while len(batch) < DB_WRITE_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+            try:
+                self._execute(batch)
+            except Exception as e:
+                logger.error(f"DB writer batch failed: {e}")
+                for job in batch:
+                    if not job.settled:
+                        self._resolve(job, error=e)
+
+    def _execute(self, batch: List[_Job]) -> None:
+        """A köteg végrehajtása sorrendben; az egymást követő rendelés mentések egy tranzakcióban"""
+        i = 0
+        while i < len(batch):
+            job = batch[i]
+            if job.op == "save_order":
+                j = i
+                while j < len(batch) and batch[j].op == "save_order":
+                    j += 1
+                self._save_orders(batch[i:j])
+                i = j
+                continue
+            self._apply(job)
+            i += 1
+
+    def _apply(self, job: _Job) -> None:
+        """Egyetlen művelet végrehajtása; a hiba csak ennek a hívónak szól"""
+        try:
+            self._resolve(job, result=getattr(self.db, job.op)(*job.args))
+        except Exception as e:
+            logger.error(f"DB write {job.op} failed: {e}")
+            self._resolve(job, error=e)
+
+    def _save_orders(self, jobs: List[_Job]) -> None:
+        if len(jobs) == 1:
+            self._apply(jobs[0])
+            return
+        try:
+            ids = self.db.save_orders([job.args[0] for job in jobs])
+        except Exception as e:
+            # egy hibás sor ne vigye magával a többit: egyenként újra
+            logger.warning(f"Batched insert of {len(jobs)} orders failed ({e}), retrying one by one")
+            for job in jobs:
+                self._apply(job)
+            return
+        for job, order_id in zip(jobs, ids):
+            self._resolve(job, result=order_id)
+        logger.info(f"Saved {len(jobs)} orders in one transaction")
+
+    @staticmethod
+    def _resolve(job: _Job, result: Any = None, error: Optional[BaseException] = None) -> None:
+        job.settled = True
+        future = job.future
+
+        def apply() -> None:
+            if future.done():
+                return  # a hívó közben megszakította
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        try:
+            job.loop.call_soon_threadsafe(apply)
+        except RuntimeError:
+            pass  # a loop már leállt
+
+# Globális async homlokzat a bothoz
+async_db = AsyncDatabase(db)
@@ -1,121 +1,473 @@
 # database/db_manager.py
+import atexit
+import time
 import sqlite3
 import logging
-from typing import Dict, List, Optional
-from config.settings import DB_NAME
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.settings import (
+    DB_NAME, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_SYNCHRONOUS
+)
 
 logger = logging.getLogger(__name__)
 
+# (oszlopnevek, sorok) - a tuple sorok oszlopsorrendje megegyezik a nevekével
+OrderRows = Tuple[List[str], List[tuple]]
+
+# Futár listák lekérdezései (dict és tuple olvasási út közösen használja)
+_OPEN_ORDERS_SQL = """
+    SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
+           group_id, group_name, created_at, status,
+           delivery_partner_id, estimated_time
+    FROM orders
+    WHERE status IN ('pending','accepted','picked_up')
+    ORDER BY created_at DESC
+"""
+
+_PENDING_ORDERS_SQL = """
+    SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
+           group_id, group_name, created_at, status
+    FROM orders WHERE status='pending' ORDER BY created_at DESC
+"""
+
+_PARTNER_ORDERS_SQL = """
+    SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
+           group_id, group_name, created_at, status, estimated_time
+    FROM orders
+    WHERE status=? AND delivery_partner_id=?
+    ORDER BY created_at DESC
+"""
+
+# Eseményekben kiküldött rendelés mezők (a nyitott lista mezői - névadatok nélkül)
+_EVENT_ORDER_FIELDS = (
+    "id", "restaurant_name", "restaurant_address", "phone_number", "order_details",
+    "group_id", "group_name", "created_at", "status", "delivery_partner_id", "estimated_time",
+    "lat", "lon",
+)
+
+def _status_event(row: sqlite3.Row, from_status: Optional[str]) -> Dict:
+    """order_status_changed esemény egy frissített sorból"""
+    return {
+        "type": "order_status_changed",
+        "from_status": from_status,
+        "order": {k: row[k] for k in _EVENT_ORDER_FIELDS},
+    }
+
+# Státuszváltás közös UPDATE-je (az időbélyeg mindig a cél státuszhoz tartozik)
+_STATUS_UPDATE_SQL = """
+    UPDATE orders
+       SET status = ?,
+           delivery_partner_id = COALESCE(?, delivery_partner_id),
+           delivery_partner_name = COALESCE(?, delivery_partner_name),
+           delivery_partner_username = COALESCE(?, delivery_partner_username),
+           estimated_time = COALESCE(?, estimated_time),
+           accepted_at = CASE WHEN ?='accepted' THEN CURRENT_TIMESTAMP ELSE accepted_at END,
+           picked_up_at = CASE WHEN ?='picked_up' THEN CURRENT_TIMESTAMP ELSE picked_up_at END,
+           delivered_at = CASE WHEN ?='delivered' THEN CURRENT_TIMESTAMP ELSE delivered_at END
+     WHERE id = ?
+"""
+
 class DatabaseManager:
     def __init__(self) -> None:
+        # Szabad kapcsolatok készlete - a Flask szálak és a bot ebből kölcsönöznek
+        self._pool: "Queue[sqlite3.Connection]" = Queue(maxsize=DB_POOL_SIZE)
+        self._closed = False
+        # Rendelések verziója: minden rendelés írás után nő (gyorsítótárak érvénytelenítéséhez)
+        self._orders_version = 0
+        self._version_lock = threading.Lock()
+        # Írás utáni esemény feliratkozók (pl. SSE értesítés a futároknak)
+        self._listeners: List[Callable[[Dict], None]] = []
         self.init_db()
-    
+
+    @property
+    def orders_version(self) -> int:
+        """Monoton növekvő számláló - ha nem változott, a rendelés listák sem változtak"""
+        return self._orders_version
+
+    def add_listener(self, callback: Callable[[Dict], None]) -> None:
+        """Feliratkozás rendelés eseményekre (order_created / order_status_changed / order_located / group_located)"""
+        self._listeners.append(callback)
+
+    def _orders_changed(self, event: Optional[Dict] = None) -> None:
+        """Commit UTÁN hívandó, hogy a verziót látó olvasó már az új adatot kapja"""
+        with self._version_lock:
+            self._orders_version += 1
+            version = self._orders_version
+        if event is None:
+            return
+        event["version"] = version
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Order event listener error: {e}")
+
+    # =============== KAPCSOLATKEZELÉS ===============
+    def _connect(self) -> sqlite3.Connection:
+        """Új, hangolt SQLite kapcsolat nyitása"""
+        conn = sqlite3.connect(DB_NAME, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except Empty:
+            return self._connect()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Kapcsolat kölcsönzése a poolból; hiba esetén rollback, a végén visszaadás"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Írási tranzakció: sikeres blokk után commit, kivételnél rollback"""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+                conn.commit()
+            finally:
+                cur.close()
+
+    def _fetch_all(self, sql: str, params: tuple = ()) -> List[Dict]:
+        with self.connection() as conn:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+    def _fetch_rows(self, sql: str, params: tuple = ()) -> "OrderRows":
+        """Sorok nyers tuple-ként (sqlite3.Row és dict nélkül) + oszlopnevek"""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.row_factory = None
+            try:
+                cur.execute(sql, params)
+                return [d[0] for d in cur.description], cur.fetchall()
+            finally:
+                cur.close()
+
+    def _fetch_one(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def close(self) -> None:
+        """Leállításkor a pool-beli kapcsolatok lezárása (az utolsó lezárás checkpointolja a WAL-t)"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except Empty:
+                break
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except Exception as e:
+                logger.error(f"DB close error: {e}")
+        logger.info("Database connections closed")
+
+    # =============== SÉMA ===============
     def init_db(self) -> None:
         """Adatbázis inicializálása és táblák létrehozása"""
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
+        with self.transaction() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    restaurant_name TEXT NOT NULL,            -- csoport neve
+                    restaurant_address TEXT NOT NULL,         -- Cím
+                    phone_number TEXT,                        -- Telefonszám
+                    order_details TEXT NOT NULL,              -- Megjegyzés
+                    group_id INTEGER NOT NULL,
+                    group_name TEXT,
+                    message_id INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT DEFAULT 'pending',            -- pending|accepted|picked_up|delivered
+                    delivery_partner_id INTEGER,
+                    delivery_partner_name TEXT,
+                    delivery_partner_username TEXT,
+                    estimated_time INTEGER,
+                    accepted_at TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS groups(
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL
+                )
+            """)
+
+            # heti összesítők - kiszállításkor inkrementálisan frissülnek
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='weekly_courier_stats'")
+            rollups_missing = cur.fetchone() is None
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS weekly_courier_stats(
+                    week TEXT NOT NULL,                       -- strftime('%Y-%W', delivered_at)
+                    delivery_partner_id INTEGER NOT NULL,
+                    courier_name TEXT NOT NULL DEFAULT '',
+                    cnt INTEGER NOT NULL DEFAULT 0,
+                    sum_min REAL NOT NULL DEFAULT 0,          -- elfogadás -> kiszállítás percek összege
+                    PRIMARY KEY (week, delivery_partner_id)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS weekly_restaurant_stats(
+                    week TEXT NOT NULL,
+                    group_name TEXT NOT NULL,
+                    cnt INTEGER NOT NULL DEFAULT 0,
+                    sum_min REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (week, group_name)
+                )
+            """)
+
+            # geokódolás cache: normalizált cím -> koordináta (lat/lon NULL = nincs találat)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_cache(
+                    address TEXT PRIMARY KEY,
+                    lat REAL,
+                    lon REAL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # értesítés outbox: a státuszváltással egy tranzakcióban íródik, a bot innen küldi ki
+            # state: pending -> sending -> sent | failed; next_attempt_at unix idő (sendingnél a lízing vége)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS notification_outbox(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    parse_mode TEXT DEFAULT 'Markdown',
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_outbox_state_next
+                ON notification_outbox(state, next_attempt_at)
+            """)
+
+            try:
+                cur.execute("PRAGMA table_info(orders)")
+                cols = [r[1] for r in cur.fetchall()]
+
+                if "picked_up_at" not in cols:
+                    cur.execute("ALTER TABLE orders ADD COLUMN picked_up_at TIMESTAMP")
+                if "delivered_at" not in cols:
+                    cur.execute("ALTER TABLE orders ADD COLUMN delivered_at TIMESTAMP")
+                # háttérben előre geokódolt cím (normalized_address NULL = még nem próbáltuk)
+                if "normalized_address" not in cols:
+                    cur.execute("ALTER TABLE orders ADD COLUMN normalized_address TEXT")
+                if "lat" not in cols:
+                    cur.execute("ALTER TABLE orders ADD COLUMN lat REAL")
+                if "lon" not in cols:
+                    cur.execute("ALTER TABLE orders ADD COLUMN lon REAL")
+
+                # étterem (felvételi pont) címe és koordinátája a csoporthoz
+                cur.execute("PRAGMA table_info(groups)")
+                group_cols = [r[1] for r in cur.fetchall()]
+                if "address" not in group_cols:
+                    cur.execute("ALTER TABLE groups ADD COLUMN address TEXT")
+                if "lat" not in group_cols:
+                    cur.execute("ALTER TABLE groups ADD COLUMN lat REAL")
+                if "lon" not in group_cols:
+                    cur.execute("ALTER TABLE groups ADD COLUMN lon REAL")
+
+                # opcionális, de hasznos indexek:
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_delivered_at ON orders(delivered_at)")
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_partner ON orders(delivery_partner_id)")
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_group ON orders(group_name)")
+
+                # státusz alapú olvasási utak (futár listák, pollozás)
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at)")
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_orders_partner_status_created
+                    ON orders(delivery_partner_id, status, created_at)
+                """)
+                # csak a nyitott rendelések - a kiszállított történet nem hízlalja
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_orders_open_created
+                    ON orders(created_at) WHERE status IN ('pending','accepted','picked_up')
+                """)
+                # friss statisztika nélkül a tervező a részleges indexet nem mindig választja
+                cur.execute("PRAGMA analysis_limit=400")
+                cur.execute("ANALYZE")
+
+            except Exception as e:
+                logger.error(f'DB migrate error: {e}')
+
+            if rollups_missing:
+                self._rebuild_weekly_stats(cur)
+
+        logger.info("Database initialized successfully")
+
+    # =============== HETI ÖSSZESÍTŐK ===============
+    @staticmethod
+    def _add_delivery_to_stats(cur: sqlite3.Cursor, order_id: int) -> None:
+        """Egy frissen kiszállított rendelés hozzáadása a heti összesítőkhöz (a hívó tranzakciójában)"""
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                restaurant_name TEXT NOT NULL,            -- csoport neve
-                restaurant_address TEXT NOT NULL,         -- Cím
-                phone_number TEXT,                        -- Telefonszám
-                order_details TEXT NOT NULL,              -- Megjegyzés
-                group_id INTEGER NOT NULL,
-                group_name TEXT,
-                message_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending',            -- pending|accepted|picked_up|delivered
-                delivery_partner_id INTEGER,
-                delivery_partner_name TEXT,
-                delivery_partner_username TEXT,
-                estimated_time INTEGER,
-                accepted_at TIMESTAMP
-            )
+            INSERT INTO weekly_courier_stats(week, delivery_partner_id, courier_name, cnt, sum_min)
+            SELECT strftime('%Y-%W', delivered_at),
+                   COALESCE(delivery_partner_id, 0),
+                   COALESCE(delivery_partner_name, ''),
+                   1,
+                   (julianday(delivered_at) - julianday(accepted_at)) * 24 * 60
+            FROM orders
+            WHERE id = ? AND delivered_at IS NOT NULL AND accepted_at IS NOT NULL
+            ON CONFLICT(week, delivery_partner_id) DO UPDATE SET
+                courier_name = excluded.courier_name,
+                cnt = cnt + excluded.cnt,
+                sum_min = sum_min + excluded.sum_min
+        """, (order_id,))
+        cur.execute("""
+            INSERT INTO weekly_restaurant_stats(week, group_name, cnt, sum_min)
+            SELECT strftime('%Y-%W', delivered_at),
+                   COALESCE(group_name, ''),
+                   1,
+                   (julianday(delivered_at) - julianday(accepted_at)) * 24 * 60
+            FROM orders
+            WHERE id = ? AND delivered_at IS NOT NULL AND accepted_at IS NOT NULL
+            ON CONFLICT(week, group_name) DO UPDATE SET
+                cnt = cnt + excluded.cnt,
+                sum_min = sum_min + excluded.sum_min
+        """, (order_id,))
+
+    @staticmethod
+    def _rebuild_weekly_stats(cur: sqlite3.Cursor) -> None:
+        """Összesítők újraszámolása a teljes rendelés történetből"""
+        cur.execute("DELETE FROM weekly_courier_stats")
+        cur.execute("DELETE FROM weekly_restaurant_stats")
+        cur.execute("""
+            INSERT INTO weekly_courier_stats(week, delivery_partner_id, courier_name, cnt, sum_min)
+            SELECT strftime('%Y-%W', delivered_at) AS week,
+                   COALESCE(delivery_partner_id, 0),
+                   MAX(COALESCE(delivery_partner_name, '')),
+                   COUNT(*),
+                   SUM((julianday(delivered_at) - julianday(accepted_at)) * 24 * 60)
+            FROM orders
+            WHERE delivered_at IS NOT NULL AND accepted_at IS NOT NULL
+            GROUP BY COALESCE(delivery_partner_id, 0), week
         """)
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS groups(
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL
-            )
+            INSERT INTO weekly_restaurant_stats(week, group_name, cnt, sum_min)
+            SELECT strftime('%Y-%W', delivered_at) AS week,
+                   COALESCE(group_name, ''),
+                   COUNT(*),
+                   SUM((julianday(delivered_at) - julianday(accepted_at)) * 24 * 60)
+            FROM orders
+            WHERE delivered_at IS NOT NULL AND accepted_at IS NOT NULL
+            GROUP BY COALESCE(group_name, ''), week
         """)
-        
-        try:
-            cur.execute("PRAGMA table_info(orders)")
-            cols = [r[1] for r in cur.fetchall()]
-
-            if "picked_up_at" not in cols:
-                cur.execute("ALTER TABLE orders ADD COLUMN picked_up_at TIMESTAMP")
-            if "delivered_at" not in cols:
-                cur.execute("ALTER TABLE orders ADD COLUMN delivered_at TIMESTAMP")
-
-            # opcionális, de hasznos indexek:
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_delivered_at ON orders(delivered_at)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_partner ON orders(delivery_partner_id)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_group ON orders(group_name)")
-            
-        except Exception as e:
-            logger.error(f'DB migrate error: {e}')
-        
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully")
 
+    def rebuild_weekly_stats(self) -> None:
+        """Egyszeri backfill: a heti összesítő táblák feltöltése a meglévő kiszállításokból"""
+        with self.transaction() as cur:
+            self._rebuild_weekly_stats(cur)
+        logger.info("Weekly stats rebuilt")
+
+    # =============== RENDELÉSEK ===============
     def register_group(self, group_id: int, group_name: str) -> None:
         """Csoport regisztrálása"""
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO groups(id, name) VALUES (?,?)", (group_id, group_name))
-        conn.commit()
-        conn.close()
+        with self.transaction() as cur:
+            cur.execute("INSERT OR IGNORE INTO groups(id, name) VALUES (?,?)", (group_id, group_name))
+
+    def set_group_address(self, group_id: int, address: str) -> None:
+        """Étterem (felvételi pont) címének beállítása; a koordinátát a háttér geokódoló tölti ki"""
+        with self.transaction() as cur:
+            cur.execute("UPDATE groups SET address = ?, lat = NULL, lon = NULL WHERE id = ?",
+                        (address, group_id))
+
+    def set_group_location(self, group_id: int, coord: Optional[Tuple[float, float]]) -> None:
+        """Étterem koordinátájának mentése (coord None = nem található)"""
+        lat, lon = coord if coord else (None, None)
+        with self.transaction() as cur:
+            cur.execute("UPDATE groups SET lat = ?, lon = ? WHERE id = ?", (lat, lon, group_id))
+            updated = cur.rowcount
+        if updated:
+            # a felvételi pont változott - a közeli rendelések index áthelyezi a csoport rendeléseit
+            self._orders_changed({"type": "group_located", "group_id": group_id, "lat": lat, "lon": lon})
+
+    def get_group_locations(self) -> Dict[int, Tuple[float, float]]:
+        """Geokódolt éttermek felvételi pontja: {csoport ID: (lat, lon)}"""
+        return {
+            row["id"]: (row["lat"], row["lon"])
+            for row in self._fetch_all("SELECT id, lat, lon FROM groups WHERE lat IS NOT NULL")
+        }
 
     def save_order(self, item: Dict) -> int:
         """Új rendelés mentése"""
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO orders
-            (restaurant_name, restaurant_address, phone_number, order_details, group_id, group_name, message_id)
-            VALUES (?,?,?,?,?,?,?)
-        """, (
-            item.get("restaurant_name",""),
-            item.get("restaurant_address",""),
-            item.get("phone_number",""),
-            item.get("order_details",""),
-            item.get("group_id"),
-            item.get("group_name"),
-            item.get("message_id"),
-        ))
-        oid = cur.lastrowid
-        conn.commit()
-        conn.close()
-        return oid
+        return self.save_orders([item])[0]
+
+    def save_orders(self, items: List[Dict]) -> List[int]:
+        """Több rendelés mentése egyetlen tranzakcióban (egy commit / fsync); az azonosítók a bemenet sorrendjében"""
+        orders = []
+        with self.transaction() as cur:
+            for item in items:
+                cur.execute("""
+                    INSERT INTO orders
+                    (restaurant_name, restaurant_address, phone_number, order_details, group_id, group_name, message_id)
+                    VALUES (?,?,?,?,?,?,?)
+                    RETURNING id, restaurant_name, restaurant_address, phone_number, order_details,
+                              group_id, group_name, created_at, status
+                """, (
+                    item.get("restaurant_name",""),
+                    item.get("restaurant_address",""),
+                    item.get("phone_number",""),
+                    item.get("order_details",""),
+                    item.get("group_id"),
+                    item.get("group_name"),
+                    item.get("message_id"),
+                ))
+                orders.append(dict(cur.fetchone()))
+        for order in orders:
+            self._orders_changed({"type": "order_created", "order": order})
+        return [order["id"] for order in orders]
 
     def get_open_orders(self) -> List[Dict]:
         """Aktív listához: pending + accepted + picked_up (hogy felvétel után is lehessen 'Kiszállítva'-ra zárni)"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
-                   group_id, group_name, created_at, status,
-                   delivery_partner_id, estimated_time
-            FROM orders
-            WHERE status IN ('pending','accepted','picked_up')
-            ORDER BY created_at DESC
-        """)
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return rows
+        return self._fetch_all(_OPEN_ORDERS_SQL)
+
+    def get_open_orders_rows(self) -> OrderRows:
+        """Mint get_open_orders, de (oszlopnevek, tuple sorok) formában - JSON gyorsúthoz"""
+        return self._fetch_rows(_OPEN_ORDERS_SQL)
+
+    def get_pending_orders_rows(self) -> OrderRows:
+        """Elérhető (még senki által el nem fogadott) rendelések, (oszlopnevek, tuple sorok) formában"""
+        return self._fetch_rows(_PENDING_ORDERS_SQL)
+
+    def get_partner_orders_rows(self, partner_id: int, status: str) -> OrderRows:
+        """Futár adott státuszú rendelései (futár felület listáihoz), (oszlopnevek, tuple sorok) formában"""
+        return self._fetch_rows(_PARTNER_ORDERS_SQL, (status, partner_id))
 
     def get_order_by_id(self, order_id: int) -> Optional[Dict]:
         """Rendelés lekérése ID alapján"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-        row = cur.fetchone()
-        conn.close()
+        row = self._fetch_one("SELECT * FROM orders WHERE id = ?", (order_id,))
         return dict(row) if row else None
 
     def update_order_status(self, order_id: int, status: str,
@@ -123,110 +475,301 @@ class DatabaseManager:
                             partner_name: str | None = None,
                             partner_username: str | None = None,
                             estimated_time: int | None = None) -> None:
-        """Rendelés státusz frissítése"""
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE orders
-               SET status = ?,
-                   delivery_partner_id = COALESCE(?, delivery_partner_id),
-                   delivery_partner_name = COALESCE(?, delivery_partner_name),
-                   delivery_partner_username = COALESCE(?, delivery_partner_username),
-                   estimated_time = COALESCE(?, estimated_time),
-                   accepted_at = CASE WHEN ?='accepted' THEN CURRENT_TIMESTAMP ELSE accepted_at END,
-                   picked_up_at = CASE WHEN ?='picked_up' THEN CURRENT_TIMESTAMP ELSE picked_up_at END,
-                   delivered_at = CASE WHEN ?='delivered' THEN CURRENT_TIMESTAMP ELSE delivered_at END
-             WHERE id = ?
-        """, (
-            status,
-            partner_id, partner_name, partner_username, estimated_time,
-            status,  # accepted
-            status,  # picked_up
-            status,  # delivered
-            order_id
-        ))
-        conn.commit()
-        conn.close()
-
-    def get_partner_addresses(self, partner_id: int, status: str) -> List[Dict]:
-        """Futár adott státuszú rendeléseinek címeit adja vissza"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, restaurant_address, group_name
+        """
+        Rendelés státusz frissítése (bármely státuszból). Ha a rendelés már `status`-ban van, nem módosul
+        (az időbélyeg nem íródik felül, a kiszállítás nem számolódik kétszer a heti összesítőkbe).
+        """
+        with self.transaction() as cur:
+            # írási zár már az előző státusz olvasása előtt: közben más nem válthat státuszt
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT status FROM orders WHERE id = ?", (order_id,))
+            prev = cur.fetchone()
+            cur.execute(_STATUS_UPDATE_SQL + " AND status != ? RETURNING *", (
+                status,
+                partner_id, partner_name, partner_username, estimated_time,
+                status,  # accepted
+                status,  # picked_up
+                status,  # delivered
+                order_id,
+                status
+            ))
+            row = cur.fetchone()
+            # csak tényleges átmenet a delivered állapotba kerül az összesítőkbe
+            if row is not None and status == "delivered":
+                self._add_delivery_to_stats(cur, order_id)
+
+        if row is None:
+            logger.info(f"Order #{order_id} already {status} (or missing), status not updated")
+            return
+        self._orders_changed(_status_event(row, prev["status"] if prev else None))
+
+    def transition_order(self, order_id: int, from_status: str, to_status: str,
+                         partner_id: int | None = None,
+                         partner_name: str | None = None,
+                         partner_username: str | None = None,
+                         estimated_time: int | None = None,
+                         notify_text: str | None = None) -> Optional[Dict]:
+        """
+        Atomikus státuszváltás: csak akkor frissít, ha a rendelés még `from_status`-ban van.
+        Siker esetén a frissített sort adja vissza, különben None (más futár megelőzte / nem létezik).
+        `notify_text` az éttermi csoportnak szóló értesítés - ugyanabban a tranzakcióban kerül az outboxba.
+        """
+        with self.transaction() as cur:
+            cur.execute(_STATUS_UPDATE_SQL + " AND status = ? RETURNING *", (
+                to_status,
+                partner_id, partner_name, partner_username, estimated_time,
+                to_status,  # accepted
+                to_status,  # picked_up
+                to_status,  # delivered
+                order_id,
+                from_status
+            ))
+            row = cur.fetchone()
+            if row is not None and to_status == "delivered" and from_status != "delivered":
+                self._add_delivery_to_stats(cur, order_id)
+            if row is not None and notify_text:
+                self._enqueue_notification(cur, row["group_id"], notify_text)
+
+        if row is None:
+            logger.info(f"Order #{order_id} transition {from_status}->{to_status} lost (state changed)")
+            return None
+        self._orders_changed(_status_event(row, from_status))
+        return dict(row)
+
+    def set_order_location(self, order_id: int, normalized_address: str,
+                           coord: Optional[Tuple[float, float]]) -> None:
+        """Háttér geokódolás eredményének mentése a rendeléshez (coord None = nem található)"""
+        lat, lon = coord if coord else (None, None)
+        with self.transaction() as cur:
+            cur.execute("UPDATE orders SET normalized_address = ?, lat = ?, lon = ? WHERE id = ? RETURNING *",
+                        (normalized_address, lat, lon, order_id))
+            row = cur.fetchone()
+        if row is not None:
+            self._orders_changed({"type": "order_located",
+                                  "order": {k: row[k] for k in _EVENT_ORDER_FIELDS}})
+
+    def get_pending_located_orders(self) -> List[Dict]:
+        """
+        Elérhető rendelések, amelyeknek van felvételi (étterem) vagy leadási koordinátája
+        (a közeli rendelések index betöltéséhez); a felvételi pont pickup_lat / pickup_lon
+        """
+        return self._fetch_all(f"""
+            SELECT {", ".join("o." + field for field in _EVENT_ORDER_FIELDS)},
+                   g.lat AS pickup_lat, g.lon AS pickup_lon
+            FROM orders o
+            LEFT JOIN groups g ON g.id = o.group_id
+            WHERE o.status='pending' AND COALESCE(g.lat, o.lat) IS NOT NULL
+        """)
+
+    def get_orders_missing_location(self, limit: int = 500) -> List[Dict]:
+        """Nyitott rendelések, amelyeket még nem próbáltunk geokódolni (induláskori pótláshoz)"""
+        return self._fetch_all("""
+            SELECT id, restaurant_address
             FROM orders
-            WHERE delivery_partner_id = ? AND status = ?
-            ORDER BY created_at
-        """, (partner_id, status))
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return rows
+            WHERE status IN ('pending','accepted','picked_up') AND normalized_address IS NULL
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (limit,))
+
+    def get_partner_route_orders(self, partner_id: int) -> List[Dict]:
+        """Futár elfogadott és felvett rendelései az étterem (felvételi pont) adataival - útvonaltervezéshez"""
+        return self._fetch_all("""
+            SELECT o.id, o.status, o.restaurant_address, o.lat, o.lon,
+                   o.group_id, o.group_name,
+                   g.address AS pickup_address, g.lat AS pickup_lat, g.lon AS pickup_lon
+            FROM orders o
+            LEFT JOIN groups g ON g.id = o.group_id
+            WHERE o.delivery_partner_id = ? AND o.status IN ('accepted','picked_up')
+            ORDER BY o.created_at
+        """, (partner_id,))
+
+    def get_dispatch_orders(self) -> List[Dict]:
+        """Elérhető rendelések a kiosztási javaslatokhoz: felvételi pont (étterem) vagy a leadási cím koordinátája"""
+        return self._fetch_all("""
+            SELECT o.id, o.restaurant_name, o.restaurant_address, o.group_id, o.group_name,
+                   COALESCE(g.lat, o.lat) AS lat, COALESCE(g.lon, o.lon) AS lon
+            FROM orders o
+            LEFT JOIN groups g ON g.id = o.group_id
+            WHERE o.status = 'pending' AND COALESCE(g.lat, o.lat) IS NOT NULL
+            ORDER BY o.created_at
+        """)
+
+    def get_idle_couriers(self, active_hours: float) -> List[Dict]:
+        """
+        Szabad futárok: az utolsó `active_hours` órában szállítottak ki, és most nincs nyitott rendelésük.
+        Helyzetük az utolsó kiszállítás címe.
+        """
+        return self._fetch_all("""
+            WITH last AS (
+                SELECT delivery_partner_id, delivery_partner_name, lat, lon, delivered_at,
+                       ROW_NUMBER() OVER (PARTITION BY delivery_partner_id
+                                          ORDER BY delivered_at DESC, id DESC) AS rn
+                FROM orders
+                WHERE status = 'delivered' AND delivered_at >= datetime('now', ?)
+                  AND delivery_partner_id IS NOT NULL
+            )
+            SELECT delivery_partner_id, delivery_partner_name, lat, lon, delivered_at
+            FROM last
+            WHERE rn = 1 AND lat IS NOT NULL
+              AND delivery_partner_id NOT IN (
+                  SELECT delivery_partner_id FROM orders
+                  WHERE status IN ('accepted','picked_up') AND delivery_partner_id IS NOT NULL
+              )
+        """, (f"-{active_hours} hours",))
 
     def get_partner_order_count(self, partner_id: int, status: str = None) -> int:
         """Futár rendeléseinek számát adja vissza (opcionálisan státusz szerint szűrve)"""
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
-        
         if status:
-            cur.execute("SELECT COUNT(*) FROM orders WHERE delivery_partner_id = ? AND status = ?", 
-                       (partner_id, status))
+            row = self._fetch_one("SELECT COUNT(*) FROM orders WHERE delivery_partner_id = ? AND status = ?",
+                                  (partner_id, status))
         else:
-            cur.execute("SELECT COUNT(*) FROM orders WHERE delivery_partner_id = ?", 
-                       (partner_id,))
-        
-        count = cur.fetchone()[0]
-        conn.close()
-        return count
+            row = self._fetch_one("SELECT COUNT(*) FROM orders WHERE delivery_partner_id = ?",
+                                  (partner_id,))
+        return row[0]
 
-    def get_weekly_courier_stats(self) -> List[Dict]:
-        """Heti futár statisztikák"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+    # =============== ÉRTESÍTÉS OUTBOX ===============
+    @staticmethod
+    def _enqueue_notification(cur: sqlite3.Cursor, chat_id: int, text: str,
+                              parse_mode: str = "Markdown") -> None:
+        """Értesítés felvétele az outboxba (a hívó tranzakciójában)"""
         cur.execute("""
-            SELECT
-              strftime('%Y-%W', delivered_at) AS week,
-              delivery_partner_id,
-              COALESCE(delivery_partner_name, '') AS courier_name,
-              COUNT(*) AS cnt,
-              ROUND(AVG((julianday(delivered_at) - julianday(accepted_at)) * 24 * 60), 1) AS avg_min
-            FROM orders
-            WHERE delivered_at IS NOT NULL AND accepted_at IS NOT NULL
-            GROUP BY delivery_partner_id, week
+            INSERT INTO notification_outbox(chat_id, text, parse_mode, next_attempt_at)
+            VALUES (?, ?, ?, ?)
+        """, (chat_id, text, parse_mode, time.time()))
+
+    def enqueue_notification(self, chat_id: int, text: str, parse_mode: str = "Markdown") -> None:
+        """Önálló értesítés (nem státuszváltáshoz kötött) felvétele az outboxba"""
+        with self.transaction() as cur:
+            self._enqueue_notification(cur, chat_id, text, parse_mode)
+
+    def claim_notifications(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        Legfeljebb `limit` esedékes értesítés lefoglalása küldésre (state -> sending, lízing `lease_seconds`).
+        A lejárt lízingű (pl. összeomlás miatt bent ragadt) sorokat is újra kiadja.
+        """
+        now = time.time()
+        with self.transaction() as cur:
+            cur.execute("""
+                UPDATE notification_outbox
+                   SET state = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                 WHERE id IN (
+                     SELECT id FROM notification_outbox
+                     WHERE state IN ('pending','sending') AND next_attempt_at <= ?
+                     ORDER BY next_attempt_at, id
+                     LIMIT ?
+                 )
+                RETURNING id, chat_id, text, parse_mode, attempts
+            """, (now + lease_seconds, now, limit))
+            rows = [dict(r) for r in cur.fetchall()]
+        rows.sort(key=lambda r: r["id"])  # RETURNING sorrendje nem garantált - chatenként a beírás sorrendje kell
+        return rows
+
+    def mark_notifications_sent(self, notification_ids: List[int]) -> None:
+        with self.transaction() as cur:
+            cur.executemany("""
+                UPDATE notification_outbox SET state = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+                WHERE id = ?
+            """, [(i,) for i in notification_ids])
+
+    def mark_notifications_failed(self, notification_ids: List[int], error: str,
+                                  retry_at: Optional[float] = None) -> None:
+        """Sikertelen küldés: `retry_at` (unix idő) esetén újra sorba kerülnek, különben végleg failed"""
+        state = "pending" if retry_at is not None else "failed"
+        with self.transaction() as cur:
+            cur.executemany("""
+                UPDATE notification_outbox
+                   SET state = ?, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at)
+                 WHERE id = ?
+            """, [(state, error[:500], retry_at, i) for i in notification_ids])
+
+    def release_claimed_notifications(self) -> int:
+        """Induláskor: az előző futásból 'sending' állapotban maradt sorok azonnal újra küldhetők"""
+        with self.transaction() as cur:
+            cur.execute("""
+                UPDATE notification_outbox SET state = 'pending', next_attempt_at = ?
+                WHERE state = 'sending'
+            """, (time.time(),))
+            return cur.rowcount
+
+    def purge_sent_notifications(self, older_than_days: int) -> int:
+        """Régi, már kiküldött értesítések törlése"""
+        with self.transaction() as cur:
+            cur.execute("""
+                DELETE FROM notification_outbox
+                WHERE state = 'sent' AND sent_at < datetime('now', ?)
+            """, (f"-{older_than_days} days",))
+            return cur.rowcount
+
+    # =============== GEOKÓDOLÁS CACHE ===============
+    def get_cached_geocode(self, address: str, ttl_days: float, negative_ttl_hours: float) -> Optional[Dict]:
+        """
+        Érvényes cache bejegyzés (lat, lon) a normalizált címhez, a találatszámláló növelésével.
+        None = nincs (érvényes) bejegyzés; lat/lon None = korábban nem volt találat.
+        """
+        with self.transaction() as cur:
+            cur.execute("""
+                UPDATE geocode_cache
+                   SET hits = hits + 1
+                 WHERE address = ?
+                   AND updated_at >= CASE WHEN lat IS NULL THEN datetime('now', ?)
+                                          ELSE datetime('now', ?) END
+                RETURNING lat, lon
+            """, (address, f"-{negative_ttl_hours} hours", f"-{ttl_days} days"))
+            row = cur.fetchone()
+        return dict(row) if row else None
+
+    def save_geocode(self, address: str, coord: Optional[Tuple[float, float]]) -> None:
+        """Geokódolás eredményének mentése (None = negatív találat)"""
+        lat, lon = coord if coord else (None, None)
+        with self.transaction() as cur:
+            cur.execute("""
+                INSERT INTO geocode_cache(address, lat, lon, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(address) DO UPDATE SET
+                    lat = excluded.lat,
+                    lon = excluded.lon,
+                    updated_at = excluded.updated_at
+            """, (address, lat, lon))
+
+    # =============== STATISZTIKÁK ===============
+    def get_weekly_courier_stats(self) -> List[Dict]:
+        """Heti futár statisztikák (előre összesített táblából)"""
+        return self._fetch_all("""
+            SELECT week, delivery_partner_id, courier_name, cnt,
+                   ROUND(sum_min / cnt, 1) AS avg_min
+            FROM weekly_courier_stats
+            WHERE cnt > 0
             ORDER BY week DESC, cnt DESC
         """)
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return rows
 
     def get_weekly_restaurant_stats(self) -> List[Dict]:
-        """Heti étterem statisztikák"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT
-              strftime('%Y-%W', delivered_at) AS week,
-              group_name,
-              COUNT(*) AS cnt,
-              ROUND(AVG((julianday(delivered_at) - julianday(accepted_at)) * 24 * 60), 1) AS avg_min
-            FROM orders
-            WHERE delivered_at IS NOT NULL AND accepted_at IS NOT NULL
-            GROUP BY group_name, week
+        """Heti étterem statisztikák (előre összesített táblából)"""
+        return self._fetch_all("""
+            SELECT week, group_name, cnt,
+                   ROUND(sum_min / cnt, 1) AS avg_min
+            FROM weekly_restaurant_stats
+            WHERE cnt > 0
             ORDER BY week DESC, cnt DESC
         """)
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return rows
 
     def get_recent_deliveries(self, limit: int = 500) -> List[Dict]:
         """Legutóbbi kézbesítések részletes listája"""
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
+        return self.get_deliveries_page(limit=limit)
+
+    def get_deliveries_page(self, before: Optional[Tuple[str, int]] = None,
+                            limit: int = 100) -> List[Dict]:
+        """
+        Kézbesítések egy oldala keyset lapozással (delivered_at, id) szerint csökkenő sorrendben.
+        `before` az előző oldal utolsó sorának (delivered_at, id) párja; None = legfrissebb oldal.
+        """
+        where = "delivered_at IS NOT NULL AND accepted_at IS NOT NULL"
+        params: tuple = ()
+        if before is not None:
+            where += " AND (delivered_at, id) < (?, ?)"
+            params = (before[0], before[1])
+        return self._fetch_all(f"""
             SELECT
+              id,
               delivered_at,
               delivery_partner_id,
               COALESCE(delivery_partner_name, '') AS courier_name,
@@ -234,13 +777,23 @@ class DatabaseManager:
               restaurant_address,
               ROUND((julianday(delivered_at) - julianday(accepted_at)) * 24 * 60, 1) AS min
             FROM orders
-            WHERE delivered_at IS NOT NULL AND accepted_at IS NOT NULL
-            ORDER BY delivered_at DESC
+            WHERE {where}
+            ORDER BY delivered_at DESC, id DESC
             LIMIT ?
-        """, (limit,))
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return rows
+        """, params + (limit,))
+
+    def iter_deliveries(self, before: Optional[Tuple[str, int]] = None,
+                        limit: int = 500, batch_size: int = 100) -> Iterator[Dict]:
+        """Kézbesítések folyamatos bejárása kis kötegekben (konstans memória, kapcsolat csak kötegenként foglalt)"""
+        remaining = limit
+        while remaining > 0:
+            page = self.get_deliveries_page(before, min(batch_size, remaining))
+            if not page:
+                return
+            yield from page
+            remaining -= len(page)
+            before = (page[-1]["delivered_at"], page[-1]["id"])
 
 # Globális adatbázis példány
 db = DatabaseManager()
+atexit.register(db.close)
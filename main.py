@@ -1,8 +1,11 @@
 # main.py
+import sys
 import threading
 from config.settings import setup_logging
 from telegram_bot.bot import RestaurantBot
 from web_app.app import run_flask
+from utils.geocode_worker import geocode_worker
+from utils.dispatcher import dispatcher
 
 def main():
     """Alkalmazás főbelépési pontja"""
@@ -14,11 +17,36 @@ def main():
     flask_thread = threading.Thread(target=run_flask, daemon=True)
     flask_thread.start()
     logger.info("Flask server started in background")
+
+    # Háttér geokódolás (a korábban be nem járt nyitott rendelésekkel együtt)
+    geocode_worker.start()
+
+    # Kiosztási javaslatok szabad futároknak (időszakosan)
+    dispatcher.start()
     
     # Bot főszálon (stabil)
     logger.info("Starting Telegram bot...")
     bot = RestaurantBot()
     bot.run()
 
+def backfill_stats():
+    """Egyszeri parancs: heti összesítők újraépítése (python main.py --backfill-stats)"""
+    setup_logging()
+    from database.db_manager import db
+    db.rebuild_weekly_stats()
+
+def import_gazetteer(csv_path: str):
+    """Egyszeri parancs: helyi címadatbázis építése CSV / OSM cím exportból
+    (python main.py --import-gazetteer cimek.csv)"""
+    setup_logging()
+    from config.settings import GAZETTEER_DB
+    from utils.gazetteer import import_csv
+    import_csv(csv_path, GAZETTEER_DB)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--backfill-stats" in sys.argv[1:]:
+        backfill_stats()
+    elif "--import-gazetteer" in sys.argv[1:-1]:
+        import_gazetteer(sys.argv[sys.argv.index("--import-gazetteer") + 1])
+    else:
+        main()
\ No newline at end of file
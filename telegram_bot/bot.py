@@ -1,20 +1,37 @@
 # telegram_bot/bot.py
 import asyncio
 import logging
+import secrets
+import signal
 from typing import Dict
-from queue import Queue, Empty
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import Application, CommandHandler, MessageHandler, ContextTypes, filters
 
-from config.settings import BOT_TOKEN, WEBAPP_URL, notification_queue
+from config.settings import (
+    BOT_TOKEN, WEBAPP_URL, BOT_MODE, WEBHOOK_PATH, WEBHOOK_SECRET,
+    BOT_CONCURRENT_UPDATES, BOT_MAX_PENDING_UPDATES
+)
 from database.db_manager import db
+from database.async_db import async_db
+from utils.geocode_worker import geocode_worker
+from telegram_bot.notifier import NotificationDispatcher
+from telegram_bot.webhook import webhook_bridge
+from telegram_bot.update_processor import ChatLaneUpdateProcessor
 
 logger = logging.getLogger(__name__)
 
 class RestaurantBot:
     def __init__(self) -> None:
-        self.app = Application.builder().token(BOT_TOKEN).build()
+        self.notifier: NotificationDispatcher | None = None
+        self.app = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .concurrent_updates(ChatLaneUpdateProcessor(BOT_CONCURRENT_UPDATES, BOT_MAX_PENDING_UPDATES))
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         self._setup_handlers()
 
     def _setup_handlers(self) -> None:
@@ -26,39 +43,14 @@ class RestaurantBot:
         # csak csoportban figyelünk szövegre
         app.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, self.handle_group_message))
 
-        # értesítési queue ürítése időzítővel
-        if app.job_queue:
-            app.job_queue.run_repeating(self.process_notifications, interval=3)
-
-    async def process_notifications(self, context: ContextTypes.DEFAULT_TYPE):
-        """Értesítések feldolgozása a queue-ból"""
-        processed_count = 0
-        max_per_batch = 5
+    async def _post_init(self, app: Application) -> None:
+        """Értesítés küldő indítása a bot event loopjában"""
+        self.notifier = NotificationDispatcher(app.bot)
+        self.notifier.start()
 
-        while processed_count < max_per_batch:
-            try:
-                item = notification_queue.get_nowait()
-                processed_count += 1
-            except Empty:
-                break
-
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    await context.bot.send_message(
-                        chat_id=item["chat_id"],
-                        text=item.get("text", ""),
-                        parse_mode="Markdown"
-                    )
-                    logger.info(f"Notifications sent successfully to {item['chat_id']}")
-                    break 
-
-                except Exception as e:
-                    logger.error(f"Failed to send notification (attempt {attempt + 1}/{max_retries}): {e}")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(1)  # 1 sec várakozás újrapróbálás előtt
-                    else:
-                        logger.error(f"Final failure sending notification to {item['chat_id']}: {item.get('text', '')[:50]}...")
+    async def _post_shutdown(self, app: Application) -> None:
+        if self.notifier is not None:
+            await self.notifier.stop()
 
     def send_notification(self, chat_id: int, text: str):
         """Értesítés hozzáadása a sorhoz megfelelő formázással"""
@@ -68,10 +60,7 @@ class RestaurantBot:
                 logger.warning(f"Invalid notification: chat_id={chat_id}, text='{text[:50] if text else 'None'}'")
                 return
                 
-            notification_queue.put({
-                "chat_id": chat_id, 
-                "text": text
-            })
+            db.enqueue_notification(chat_id, text)
             logger.info(f"Notification queued for chat {chat_id}")
         except Exception as e:
             logger.error(f"Error queuing notification: {e}")
@@ -89,7 +78,7 @@ class RestaurantBot:
             )
         else:
             await update.message.reply_text(
-                "Használd a /register parancsot a csoport regisztrálásához.\n"
+                "Használd a /register <étterem címe> parancsot a csoport regisztrálásához.\n"
                 "Rendelés formátum:\n"
                 "Cím: ...\nTelefonszám: ...\nMegjegyzés: ..."
             )
@@ -110,7 +99,15 @@ class RestaurantBot:
         
         gid = update.effective_chat.id
         gname = update.effective_chat.title or "Ismeretlen csoport"
-        db.register_group(gid, gname)
+        await async_db.register_group(gid, gname)
+
+        # opcionális étterem cím (/register <cím>) - ez lesz a futár felvételi pontja
+        address = " ".join(context.args or []).strip()
+        if address:
+            await async_db.set_group_address(gid, address)
+            geocode_worker.submit_group(gid, address)
+            await update.message.reply_text(f"✅ A '{gname}' csoport regisztrálva.\n📍 Felvételi cím: {address}")
+            return
         await update.message.reply_text(f"✅ A '{gname}' csoport regisztrálva.")
 
     def parse_order_message(self, text: str) -> Dict | None:
@@ -164,7 +161,10 @@ class RestaurantBot:
             "message_id": update.message.message_id
         }
         
-        order_id = db.save_order(item)
+        # író szálon, kötegelve - a commit nem blokkolja az event loopot
+        order_id = await async_db.save_order(item)
+        # koordináta előre, háttérben - az útvonaltervezés így nem vár a Nominatimra
+        geocode_worker.submit(order_id, item["restaurant_address"])
         await update.message.reply_text(
             "✅ Rendelés rögzítve.\n\n"
             f"📍 Cím: {item['restaurant_address']}\n"
@@ -174,5 +174,39 @@ class RestaurantBot:
         )
 
     def run(self) -> None:
-        """Bot indítása"""
-        self.app.run_polling(allowed_updates=Update.ALL_TYPES)
+        """Bot indítása (BOT_MODE: polling vagy webhook)"""
+        if BOT_MODE == "webhook":
+            asyncio.run(self._run_webhook())
+        else:
+            self.app.run_polling(allowed_updates=Update.ALL_TYPES)
+
+    async def _run_webhook(self) -> None:
+        """
+        Webhook mód: a Telegram a Flask szerverre (WEBAPP_URL + WEBHOOK_PATH) küldi az update-eket,
+        onnan a webhook_bridge teszi őket az update_queue-ba - nincs long-poll kör.
+        """
+        app = self.app
+        secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        url = WEBAPP_URL.rstrip("/") + WEBHOOK_PATH
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # pl. Windows: marad a KeyboardInterrupt
+
+        await app.initialize()
+        await self._post_init(app)
+        try:
+            await app.start()
+            webhook_bridge.attach(app, loop, secret)
+            await app.bot.set_webhook(url=url, secret_token=secret, allowed_updates=Update.ALL_TYPES)
+            logger.info(f"Webhook mode: receiving updates at {url}")
+            await stop.wait()
+        finally:
+            webhook_bridge.detach()
+            if app.running:
+                await app.stop()
+            await self._post_shutdown(app)
+            await app.shutdown()
@@ -0,0 +1,320 @@
+# telegram_bot/notifier.py
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from config.settings import (
+    NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_RATE, NOTIFY_GROUP_RATE_PER_MIN,
+    NOTIFY_MAX_CONCURRENCY, NOTIFY_MAX_RETRIES, NOTIFY_BACKOFF_BASE, NOTIFY_BACKOFF_MAX,
+    NOTIFY_CLAIM_BATCH, NOTIFY_MAX_IN_FLIGHT, NOTIFY_POLL_INTERVAL, NOTIFY_CLAIM_LEASE_SECONDS,
+    NOTIFY_OUTBOX_RETENTION_DAYS, NOTIFY_OUTBOX_RETRY_BASE, NOTIFY_OUTBOX_RETRY_MAX,
+    NOTIFY_OUTBOX_MAX_ATTEMPTS, NOTIFY_COALESCE_WINDOW, NOTIFY_COALESCE_MAX_DELAY,
+    NOTIFY_MAX_MESSAGE_LEN, NOTIFY_METRICS_LOG_SECONDS
+)
+from database.db_manager import db
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter várakozás másodpercben (a PTB verziótól függően int vagy timedelta)"""
+    value = error.retry_after
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+DIGEST_SEPARATOR = "\n➖➖➖➖➖\n\n"
+
+_MARKDOWN_MARKERS = "*_`"
+
+def _markdown_balanced(text: str) -> bool:
+    """
+    Legacy Markdown: minden entitás (*, _, `) lezárul-e az üzeneten belül.
+    A felhasználói nevekben gyakori az `_`; egy lezáratlan jelölő összefűzéskor
+    a következő üzenet jelölőivel párosodna, ezért az ilyen üzenet nem kerül összesítőbe.
+    """
+    open_marker = None
+    escaped = False
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif ch == "\\" and open_marker is None:
+            escaped = True
+        elif ch in _MARKDOWN_MARKERS:
+            if open_marker is None:
+                open_marker = ch
+            elif open_marker == ch:
+                open_marker = None
+    return open_marker is None
+
+class _ChatBuffer:
+    """Egy chat összegyűjtött értesítései az összevonási ablakban"""
+
+    def __init__(self, now: float) -> None:
+        self.items: List[Dict] = []
+        self.first = now   # az ablak kezdete (legkésőbb first + max delay-kor kimegy)
+        self.last = now    # utolsó érkezés (csend után kimegy)
+
+class NotificationDispatcher:
+    """
+    Értesítések folyamatos, párhuzamos kiküldése az adatbázis outboxából (notification_outbox).
+    - a sorokat kötegekben foglalja le, küldés után sent / failed állapotba teszi őket;
+      átmeneti hibánál (hálózat, RetryAfter) a sor pending marad, és visszalépés után újra sorra kerül
+    - globális és chatenkénti token bucket a Telegram limitjeihez
+    - chatenként sorrendtartó (egy chat üzenetei egymás után, a különböző chatek párhuzamosan)
+    - RetryAfter esetén a kért ideig vár, egyéb átmeneti hibánál exponenciális visszalépés;
+      mindez az adott üzenet saját taskjában, a sor ürítését nem tartja fel
+    - chatenként összevonás: az ablakon (NOTIFY_COALESCE_WINDOW) belül érkező üzenetek egyetlen
+      összesítő üzenetként mennek ki, legfeljebb NOTIFY_COALESCE_MAX_DELAY késéssel
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self._global_bucket = TokenBucket(rate=NOTIFY_GLOBAL_RATE, capacity=NOTIFY_GLOBAL_RATE)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_pending: Dict[int, int] = {}
+        self._semaphore = asyncio.Semaphore(NOTIFY_MAX_CONCURRENCY)
+        self._buffers: Dict[Tuple[int, Optional[str]], _ChatBuffer] = {}
+        self._in_flight = 0  # lefoglalt, még le nem zárt outbox sorok
+        self._tasks: Set[asyncio.Task] = set()
+        self._drain_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # metrikák: beérkezett értesítések, ténylegesen elküldött üzenetek, összevonással megspórolt küldések
+        self.metrics = {"notifications": 0, "sends": 0, "saved_sends": 0, "failed": 0, "deferred": 0}
+        self._metrics_logged_at = time.monotonic()
+
+    def start(self) -> None:
+        """Ürítő task indítása (a bot event loopjában hívandó)"""
+        if self._drain_task is None or self._drain_task.done():
+            self._stopping = False
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def stop(self) -> None:
+        """Ürítés leállítása; a már elindult küldéseket megvárja"""
+        self._stopping = True
+        if self._drain_task is not None:
+            await self._drain_task
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._log_metrics()
+
+    def _log_metrics(self) -> None:
+        m = self.metrics
+        logger.info(f"Notifications: {m['notifications']} queued, {m['sends']} sends "
+                    f"({m['saved_sends']} saved by coalescing), {m['failed']} failed, {m['deferred']} deferred")
+        self._metrics_logged_at = time.monotonic()
+
+    async def _drain(self) -> None:
+        try:
+            # előző futásból félbemaradt küldések azonnal újra mehetnek; a régi kiküldöttek törlődnek
+            released = await asyncio.to_thread(db.release_claimed_notifications)
+            if released:
+                logger.info(f"Re-queued {released} notifications claimed by a previous run")
+            await asyncio.to_thread(db.purge_sent_notifications, NOTIFY_OUTBOX_RETENTION_DAYS)
+        except Exception as e:
+            logger.error(f"Notification outbox maintenance failed: {e}")
+
+        while not self._stopping:
+            if time.monotonic() - self._metrics_logged_at >= NOTIFY_METRICS_LOG_SECONDS:
+                self._log_metrics()
+            room = NOTIFY_MAX_IN_FLIGHT - self._in_flight
+            items = []
+            if room > 0:
+                try:
+                    items = await asyncio.to_thread(
+                        db.claim_notifications, min(NOTIFY_CLAIM_BATCH, room), NOTIFY_CLAIM_LEASE_SECONDS
+                    )
+                except Exception as e:
+                    logger.error(f"Notification claim failed: {e}")
+            for item in items:
+                self.submit(item)
+            if len(items) < NOTIFY_CLAIM_BATCH or room <= 0:
+                await asyncio.sleep(NOTIFY_POLL_INTERVAL)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def submit(self, item: Dict) -> None:
+        """Egy lefoglalt outbox sor a chat gyűjtőjébe; az első sor indítja a gyűjtő ürítését"""
+        key = (item["chat_id"], item.get("parse_mode"))
+        now = asyncio.get_running_loop().time()
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _ChatBuffer(now)
+            self._spawn(self._flush_when_quiet(key, buffer))
+        buffer.items.append(item)
+        buffer.last = now
+        self._in_flight += 1
+        self.metrics["notifications"] += 1
+
+    async def _flush_when_quiet(self, key: Tuple[int, Optional[str]], buffer: _ChatBuffer) -> None:
+        """Vár, amíg az ablakban nem jön új üzenet (vagy letelik a max. késés), majd kiküldi a gyűjtőt"""
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline = min(buffer.last + NOTIFY_COALESCE_WINDOW, buffer.first + NOTIFY_COALESCE_MAX_DELAY)
+            delay = deadline - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        del self._buffers[key]
+        for batch in self._digests(buffer.items):
+            await self._deliver(batch)
+
+    @staticmethod
+    def _mergeable(item: Dict) -> bool:
+        parse_mode = (item.get("parse_mode") or "").lower()
+        return parse_mode != "markdown" or _markdown_balanced(item["text"])
+
+    @classmethod
+    def _digests(cls, items: List[Dict]) -> List[List[Dict]]:
+        """
+        Az összegyűjtött üzenetek kötegekre bontása, hogy egy összesítő se lépje túl a Telegram hosszkorlátot.
+        A nem összefűzhető (lezáratlan Markdown jelölős) üzenetek sorrendben, önállóan mennek ki.
+        """
+        batches: List[List[Dict]] = []
+        size = 0
+        open_batch = False  # az utolsó köteghez még hozzá lehet fűzni
+        for item in items:
+            length = len(item["text"]) + len(DIGEST_SEPARATOR)
+            if not cls._mergeable(item):
+                batches.append([item])
+                open_batch = False
+            elif open_batch and size + length <= NOTIFY_MAX_MESSAGE_LEN:
+                batches[-1].append(item)
+                size += length
+            else:
+                batches.append([item])
+                size = length
+                open_batch = True
+        return batches
+
+    @staticmethod
+    def _digest_text(items: List[Dict]) -> str:
+        if len(items) == 1:
+            return items[0]["text"]
+        return DIGEST_SEPARATOR.join(item["text"].rstrip("\n") for item in items)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # csoportba percenként kevesebb üzenet mehet, mint privát chatbe
+            rate = NOTIFY_GROUP_RATE_PER_MIN / 60.0 if chat_id < 0 else NOTIFY_CHAT_RATE
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate=rate, capacity=1)
+        return bucket
+
+    async def _deliver(self, items: List[Dict]) -> None:
+        """Egy (összevont) üzenet kiküldése és az outbox sorok lezárása"""
+        chat_id = items[0]["chat_id"]
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        self._chat_pending[chat_id] = self._chat_pending.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                results = await self._send_digest(chat_id, items)
+            for sent_items, error, retry_at in results:
+                ids = [item["id"] for item in sent_items]
+                if error is None:
+                    self.metrics["sends"] += 1
+                    self.metrics["saved_sends"] += len(sent_items) - 1
+                elif retry_at is not None:
+                    self.metrics["deferred"] += len(sent_items)
+                else:
+                    self.metrics["failed"] += len(sent_items)
+                try:
+                    if error is None:
+                        await asyncio.to_thread(db.mark_notifications_sent, ids)
+                    else:
+                        # retry_at-tal a sor pending marad, különben végleg failed
+                        await asyncio.to_thread(db.mark_notifications_failed, ids, error, retry_at)
+                except Exception as e:
+                    logger.error(f"Could not record notification {ids} result: {e}")
+        finally:
+            self._in_flight -= len(items)
+            self._chat_pending[chat_id] -= 1
+            if not self._chat_pending[chat_id]:
+                # nincs több várakozó üzenet ehhez a chathez - a zár eldobható
+                del self._chat_pending[chat_id]
+                self._chat_locks.pop(chat_id, None)
+
+    async def _send_digest(self, chat_id: int,
+                           items: List[Dict]) -> List[Tuple[List[Dict], Optional[str], Optional[float]]]:
+        """
+        Összesítő küldése; ha a Telegram elutasítja (pl. hibás formázás), az elemei egyenként mennek ki,
+        így csak a ténylegesen hibás üzenet vész el.
+        Visszatérés: [(elemek, hiba vagy None, újrapróbálás ideje (unix) átmeneti hibánál, különben None)]
+        """
+        ids = [item["id"] for item in items]
+        try:
+            error, wait = await self._send_with_retry(chat_id, self._digest_text(items),
+                                                      items[0].get("parse_mode"), ids)
+        except BadRequest as e:
+            logger.warning(f"Digest {ids} for {chat_id} rejected ({e}), sending its messages one by one")
+            results: List[Tuple[List[Dict], Optional[str], Optional[float]]] = []
+            for item in items:
+                results.extend(await self._send_digest(chat_id, [item]))
+            return results
+        retry_at = self._retry_at(items, wait) if error is not None and wait is not None else None
+        return [(items, error, retry_at)]
+
+    @staticmethod
+    def _retry_at(items: List[Dict], wait: float) -> Optional[float]:
+        """
+        Átmeneti hiba után mikor kerüljön újra sorra az outbox sor (unix idő): lefoglalásonként
+        exponenciális visszalépés, de legalább a Telegram által kért várakozás.
+        NOTIFY_OUTBOX_MAX_ATTEMPTS lefoglalás után None - a sor végleg failed.
+        """
+        attempts = max(item.get("attempts") or 1 for item in items)
+        if attempts >= NOTIFY_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Giving up notification {[item['id'] for item in items]} after {attempts} attempts")
+            return None
+        delay = min(NOTIFY_OUTBOX_RETRY_MAX, NOTIFY_OUTBOX_RETRY_BASE * 2 ** (attempts - 1))
+        return time.time() + max(delay, wait)
+
+    async def _send_with_retry(self, chat_id: int, text: str, parse_mode: Optional[str],
+                               ids: List[int]) -> Tuple[Optional[str], Optional[float]]:
+        """
+        Küldés újrapróbálással; visszatérés: (hiba, várakozás).
+        Siker: (None, None). Végleges hiba (Forbidden, BadRequest): (hiba, None).
+        Átmeneti hiba az újrapróbálások után is: (utolsó hiba, az utolsó kért / számolt várakozás mp-ben).
+        Több üzenetből álló összesítő BadRequest hibáját továbbdobja (a hívó egyenként újraküldi).
+        """
+        error = ""
+        wait = 0.0
+        for attempt in range(1, NOTIFY_MAX_RETRIES + 1):
+            # előbb a globális, utána a chat token: így a chat keret a tényleges küldéshez igazodik
+            # (fordítva a globális várakozás alatt a chat bucket újratöltődne, és két üzenet összecsúszhatna)
+            await self._global_bucket.acquire_async()
+            await self._chat_bucket(chat_id).acquire_async()
+            try:
+                async with self._semaphore:
+                    await self.bot.send_message(
+                        chat_id=chat_id,
+                        text=text,
+                        parse_mode=parse_mode or None
+                    )
+                logger.info(f"Notification {ids} sent to {chat_id}")
+                return None, None
+            except RetryAfter as e:
+                wait = _retry_after_seconds(e)
+                error = str(e)
+                logger.warning(f"Flood limit for {chat_id}, retrying in {wait:.0f}s")
+            except (BadRequest, Forbidden) as e:
+                # nem átmeneti (hibás formázás, kitiltott bot) - újrapróbálni felesleges
+                if isinstance(e, BadRequest) and len(ids) > 1:
+                    raise
+                logger.error(f"Notification to {chat_id} rejected: {e}")
+                return str(e), None
+            except Exception as e:  # hálózati hiba, időtúllépés, szerver hiba
+                wait = min(NOTIFY_BACKOFF_MAX, NOTIFY_BACKOFF_BASE * 2 ** (attempt - 1))
+                error = str(e)
+                logger.warning(f"Failed to send notification to {chat_id} "
+                               f"(attempt {attempt}/{NOTIFY_MAX_RETRIES}): {e}")
+            if attempt < NOTIFY_MAX_RETRIES:
+                await asyncio.sleep(wait)
+
+        logger.warning(f"Sending notification {ids} to {chat_id} failed {NOTIFY_MAX_RETRIES} times: {error}")
+        return error, wait
@@ -0,0 +1,72 @@
+# telegram_bot/update_processor.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class ChatLaneUpdateProcessor(BaseUpdateProcessor):
+    """
+    Párhuzamos update feldolgozás chatenkénti soros sávokkal: a különböző chatek update-jei
+    egyszerre futnak (legfeljebb `max_concurrent` handler), egy chat update-jei viszont
+    érkezési sorrendben, egymás után. Így egy lassú csoport (lassú DB írás, lassú reply_text)
+    nem tartja fel a többi étterem rendeléseinek rögzítését.
+
+    A PTB saját szemaforja (`max_pending`) csak a várakozó update-ek számát korlátozza;
+    a tényleges párhuzamosságot a sáv megszerzése UTÁN foglalt saját szemafor adja,
+    így a saját sávjára váró update nem foglal feldolgozási helyet.
+    """
+
+    def __init__(self, max_concurrent: int, max_pending: int) -> None:
+        super().__init__(max(max_pending, max_concurrent, 2))  # >1, különben a PTB sorosan futtat
+        self._running = asyncio.Semaphore(max_concurrent)
+        self._lanes: Dict[int, asyncio.Lock] = {}
+        self._lane_pending: Dict[int, int] = {}
+
+    @staticmethod
+    def _lane_key(update: object) -> Optional[int]:
+        """Sáv azonosító: a chat, chat nélküli update-nél (pl. inline query) a felhasználó"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._lane_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        # a zár várakozói FIFO sorrendben jutnak sorra, és a taskok érkezési sorrendben indulnak,
+        # ezért egy chaten belül az update-ek sorrendje megmarad
+        lock = self._lanes.setdefault(key, asyncio.Lock())
+        self._lane_pending[key] = self._lane_pending.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._running:
+                    await coroutine
+        finally:
+            self._lane_pending[key] -= 1
+            if not self._lane_pending[key]:
+                # üres sáv - a zár eldobható
+                del self._lane_pending[key]
+                self._lanes.pop(key, None)
+
+    @property
+    def active_lanes(self) -> int:
+        """Jelenleg futó vagy várakozó update-tel rendelkező chatek száma"""
+        return len(self._lanes)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._lanes:
+            logger.info(f"Update processor shutting down with {len(self._lanes)} active chat lanes")
@@ -0,0 +1,57 @@
+# telegram_bot/webhook.py
+import asyncio
+import hmac
+import logging
+import threading
+from typing import Dict, Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+class WebhookBridge:
+    """
+    Híd a Flask szálak és a bot event loopja között webhook módban: a Flask végpont
+    ellenőrzi a titkos tokent, és a beérkező update-et a bot Application update_queue-jába teszi.
+    Polling módban nincs csatolva (a végpont ilyenkor 404-et ad).
+    """
+
+    def __init__(self) -> None:
+        self._app: Optional[Application] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._secret: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def attach(self, app: Application, loop: asyncio.AbstractEventLoop, secret: str) -> None:
+        with self._lock:
+            self._app, self._loop, self._secret = app, loop, secret
+
+    def detach(self) -> None:
+        with self._lock:
+            self._app = self._loop = self._secret = None
+
+    @property
+    def active(self) -> bool:
+        return self._app is not None
+
+    def verify(self, token: Optional[str]) -> bool:
+        """X-Telegram-Bot-Api-Secret-Token fejléc ellenőrzése (időzítés-biztos összehasonlítás)"""
+        secret = self._secret
+        return bool(secret) and token is not None and hmac.compare_digest(token, secret)
+
+    def feed(self, payload: Dict, timeout: float = 5.0) -> bool:
+        """Update átadása a botnak; True, ha bekerült az update_queue-ba"""
+        with self._lock:
+            app, loop = self._app, self._loop
+        if app is None or loop is None:
+            return False
+        update = Update.de_json(payload, app.bot)
+        if update is None:
+            return False
+        future = asyncio.run_coroutine_threadsafe(app.update_queue.put(update), loop)
+        future.result(timeout=timeout)
+        return True
+
+# Globális híd - a bot webhook módban csatolja, a Flask végpont ezen keresztül ad át
+webhook_bridge = WebhookBridge()
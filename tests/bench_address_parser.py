@@ -0,0 +1,46 @@
+# tests/bench_address_parser.py
+"""
+Címnormalizálás mérés: a régi (mintánként re.sub-os) parser a jelenlegi egy mintás,
+memoizált parse_hungarian_address ellen, ugyanazon a generált korpuszon.
+A memo nélküli szám a tiszta minta nyereség, a meleg memo a visszatérő címeket mutatja
+(a memo 4096 címes, ennél nagyobb korpuszon a meleg futás is kiszorítással jár).
+
+Futtatás: python tests/bench_address_parser.py [címek száma] [ismétlés]
+"""
+import os
+import sys
+import time
+
+# közvetlen futtatáskor is a repó gyökeréből (és a tests könyvtárból) importáljon
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_address_parser import _corpus, legacy_parse_hungarian_address
+from utils.address_parser import parse_hungarian_address
+
+def _best_ms(fn, addresses, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for addr in addresses:
+            fn(addr)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+def main(size: int = 3000, repeat: int = 5) -> None:
+    addresses = _corpus(size)
+    legacy = _best_ms(legacy_parse_hungarian_address, addresses, repeat)
+    uncached = _best_ms(parse_hungarian_address.__wrapped__, addresses, repeat)
+    parse_hungarian_address.cache_clear()
+    cold = _best_ms(parse_hungarian_address, addresses, 1)
+    warm = _best_ms(parse_hungarian_address, addresses, repeat)
+    per_addr = 1000 / len(addresses)
+    print(f"{len(addresses)} cím, legjobb {repeat} futásból:")
+    print(f"  régi parser:        {legacy:8.2f} ms ({legacy * per_addr:.2f} µs/cím)")
+    print(f"  új, memo nélkül:    {uncached:8.2f} ms ({legacy / uncached:.1f}x)")
+    print(f"  új, hideg memo:     {cold:8.2f} ms ({legacy / cold:.1f}x)")
+    print(f"  új, meleg memo:     {warm:8.2f} ms ({legacy / warm:.1f}x)")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
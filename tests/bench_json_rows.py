@@ -0,0 +1,73 @@
+# tests/bench_json_rows.py
+"""
+Nyitott rendelés lista kódolása 1k / 10k rendelésen: a korábbi út (sqlite3.Row -> dict -> jsonify)
+és a tuple sorok közvetlen kódolása (DatabaseManager.get_open_orders_rows + dumps_rows),
+a beépített json modullal és - ha telepítve van - orjson-nal.
+
+Futtatás: python tests/bench_json_rows.py [ismétlés]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# közvetlen futtatáskor is a repó gyökeréből importáljon
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+
+def _seed(db, count: int) -> None:
+    with db.transaction() as cur:
+        cur.execute("DELETE FROM orders")
+        cur.executemany("""
+            INSERT INTO orders(restaurant_name, restaurant_address, phone_number, order_details,
+                               group_id, group_name, message_id, status, delivery_partner_id, estimated_time)
+            VALUES (?,?,?,?,?,?,?,?,?,?)
+        """, [
+            ("Pizzéria Nápoly", f"1051 Budapest, Nádor utca {i % 80 + 1}.", "+36301234567",
+             "kp, 2 db margherita, csengő: Kovács", -100 - i % 20, "Pizzéria Nápoly", i,
+             ("pending", "accepted", "picked_up")[i % 3], None if i % 3 == 0 else 1000 + i % 50,
+             None if i % 3 == 0 else 25)
+            for i in range(count)
+        ])
+
+def _measure(fn, repeats: int) -> float:
+    fn()  # bemelegítés
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1000
+
+def main(repeats: int = 10) -> None:
+    # a modul globális adatbázis példánya ne a repóban lévő fájlt nyissa meg
+    os.chdir(tempfile.mkdtemp())
+    from database import db_manager
+    from utils import json_fast
+
+    db = db_manager.db
+    app = Flask(__name__)
+
+    def legacy():
+        with app.app_context():
+            with db.connection() as conn:
+                rows = conn.execute(db_manager._OPEN_ORDERS_SQL).fetchall()
+            return jsonify([dict(r) for r in rows]).get_data()
+
+    def fast():
+        return json_fast.dumps_rows(*db.get_open_orders_rows())
+
+    orjson = json_fast.orjson
+    for count in (1000, 10000):
+        _seed(db, count)
+        results = [("Row -> dict -> jsonify", _measure(legacy, repeats))]
+        json_fast.orjson = None
+        results.append(("tuple -> json (stdlib)", _measure(fast, repeats)))
+        json_fast.orjson = orjson
+        if orjson is not None:
+            results.append(("tuple -> json (orjson)", _measure(fast, repeats)))
+        base = results[0][1]
+        for name, ms in results:
+            print(f"{count:>6} rendelés | {name:<24} | {ms:8.2f} ms | {base / ms:4.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,81 @@
+# tests/bench_route_optimizer.py
+"""
+Útvonal sorrend mérés: a korábbi mohó (legközelebbi szomszéd) router a jelenlegi
+solve_path ellen - útvonalhossz és futásidő véletlen budapesti pontokon.
+
+Futtatás: python tests/bench_route_optimizer.py [ismétlés]
+"""
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List, Sequence, Tuple
+
+# közvetlen futtatáskor is a repó gyökeréből importáljon
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.route_optimizer import path_length, solve_path
+
+# (a utils.geocoding importja a rendelés adatbázist is megnyitná - a mérésnek csak a képlet kell)
+def haversine_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*coord1, *coord2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+def distance_matrix(coords: Sequence[Tuple[float, float]]) -> List[List[float]]:
+    return [[haversine_distance(a, b) for b in coords] for a in coords]
+
+def greedy_route(coords: Sequence[Tuple[float, float]]) -> List[int]:
+    """
+    A korábbi utils.geocoding.optimize_route sorrendje (referencia): az első címtől mindig a
+    legközelebbi még nem érintett cím. Az eredeti 6 címes korlátja itt nincs, hogy nagyobb
+    útvonalakon is összevethető legyen.
+    """
+    if len(coords) <= 1:
+        return list(range(len(coords)))
+    order = [0]
+    remaining = list(range(1, len(coords)))
+    current = coords[0]
+    while remaining:
+        min_distance = float('inf')
+        next_idx = remaining[0]
+        for idx in remaining:
+            distance = haversine_distance(current, coords[idx])
+            if distance < min_distance:
+                min_distance = distance
+                next_idx = idx
+        order.append(next_idx)
+        current = coords[next_idx]
+        remaining.remove(next_idx)
+    return order
+
+def _budapest_points(rng: random.Random, n: int) -> List[Tuple[float, float]]:
+    return [(rng.uniform(47.43, 47.56), rng.uniform(18.98, 19.15)) for _ in range(n)]
+
+def main(repeats: int = 20) -> None:
+    rng = random.Random(42)
+    print(f"{'címek':>5} | {'mohó km':>8} | {'új km':>8} | {'rövidebb':>8} | {'mohó ms':>8} | {'új ms':>8}")
+    for n in (4, 6, 8, 10, 12, 16, 25, 40):
+        greedy_km, new_km, greedy_ms, new_ms = [], [], [], []
+        for _ in range(repeats):
+            coords = _budapest_points(rng, n)
+            dist = distance_matrix(coords)
+
+            started = time.perf_counter()
+            order = greedy_route(coords)
+            greedy_ms.append((time.perf_counter() - started) * 1000)
+            greedy_km.append(path_length(dist, order))
+
+            started = time.perf_counter()
+            order = solve_path(dist, start=0, time_budget=0.5)
+            new_ms.append((time.perf_counter() - started) * 1000)
+            new_km.append(path_length(dist, order))
+
+        saved = 1 - sum(new_km) / sum(greedy_km)
+        print(f"{n:>5} | {statistics.mean(greedy_km):>8.2f} | {statistics.mean(new_km):>8.2f} | "
+              f"{saved:>7.1%} | {statistics.mean(greedy_ms):>8.2f} | {statistics.mean(new_ms):>8.2f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
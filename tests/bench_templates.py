@@ -0,0 +1,66 @@
+# tests/bench_templates.py
+"""
+Sablon mérés: kérésenkénti render_template_string / stream_template_string (minden kérés
+újrafordítja a sablont) a web_app.templates.registry egyszer fordított sablonjai ellen.
+Kérésenként megtakarított CPU idő a futár felületen ("/") és az admin oldalon.
+
+Futtatás: python tests/bench_templates.py [ismétlés]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# közvetlen futtatáskor is a repó gyökeréből importáljon
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template_string, stream_template_string
+
+def _measure(fn, repeats: int) -> float:
+    fn()  # bemelegítés
+    started = time.process_time()
+    for _ in range(repeats):
+        fn()
+    return (time.process_time() - started) / repeats * 1000
+
+def _admin_context(rows: int) -> dict:
+    weekly = [{"week": "2026-41", "courier_name": f"Futár {i}", "group_name": f"Étterem {i}",
+               "delivery_partner_id": 1000 + i, "cnt": 40 + i, "avg_min": 22.5} for i in range(20)]
+    deliveries = [{"id": i, "delivered_at": f"2026-10-1{i % 8} 12:{i % 60:02d}:00", "courier_name": "Kiss Péter",
+                   "delivery_partner_id": 1001, "group_name": "Pizzéria Nápoly",
+                   "restaurant_address": f"1051 Budapest, Nádor utca {i % 80 + 1}.", "min": 18}
+                  for i in range(rows)]
+    return dict(weekly_courier=weekly, weekly_restaurant=weekly, deliveries=deliveries,
+                page_size=rows, init_data="query_id=teszt&user=%7B%22id%22%3A1%7D")
+
+def main(repeats: int = 200) -> None:
+    # az app importja megnyitja a globális adatbázist - ne a repóban lévő fájlt
+    os.chdir(tempfile.mkdtemp())
+    from web_app.app import create_app
+    from web_app.templates.registry import get_template
+    from web_app.templates.templates import ADMIN_HTML, HTML_TEMPLATE
+
+    app = create_app()
+    client = app.test_client()
+    context = _admin_context(100)
+
+    with app.test_request_context("/"):
+        index_old = _measure(lambda: render_template_string(HTML_TEMPLATE), repeats)
+        admin_old = _measure(lambda: "".join(stream_template_string(ADMIN_HTML, **context)), repeats)
+        admin_new = _measure(lambda: "".join(get_template("admin").generate(**context)), repeats)
+    index_new = _measure(lambda: client.get("/").get_data(), repeats)
+    etag = client.get("/").headers["ETag"]
+    index_304 = _measure(lambda: client.get("/", headers={"If-None-Match": etag}).status_code, repeats)
+
+    print(f"CPU idő kérésenként, {repeats} ismétlés átlaga:")
+    print(f"  futár felület, render_template_string:      {index_old:7.3f} ms")
+    print(f"  futár felület, teljes GET / (előrenderelt): {index_new:7.3f} ms "
+          f"(megtakarítás {index_old - index_new:.3f} ms)")
+    print(f"  futár felület, GET / 304 válasz:            {index_304:7.3f} ms")
+    print(f"  admin (100 sor), stream_template_string:    {admin_old:7.3f} ms")
+    print(f"  admin (100 sor), lefordított sablon:        {admin_new:7.3f} ms "
+          f"(megtakarítás {admin_old - admin_new:.3f} ms)")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,97 @@
+# tests/test_address_parser.py
+"""
+Az egy mintás, memoizált parse_hungarian_address kimenete minden címre ugyanaz,
+mint a régi (mintánként re.sub-os) megvalósításé - generált, valósághű címkorpuszon.
+"""
+import random
+import re
+from typing import List
+
+import pytest
+
+from utils.address_parser import expand_abbreviations, parse_hungarian_address, parse_hungarian_addresses
+
+# A régi megvalósítás változatlan másolata - ehhez mérjük az újat
+_LEGACY_ABBREVIATIONS = {
+    r'\bsgt\b': 'sugárút',
+    r'\bkrt\b': 'körút',
+    r'\but\b': 'utca',
+    r'\bút\b': 'utca',
+    r'\btér\b': 'tér',
+    r'\bpl\b': 'pályaudvar',
+    r'\báll\b': 'állomás',
+    r'\bker\b': 'kerület',
+    r'\bker\.\b': 'kerület',
+    **{rf'\b{roman}\.\s*ker\b': f'{roman}. kerület' for roman in (
+        'V', 'I', 'II', 'III', 'IV', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII', 'XIII',
+        'XIV', 'XV', 'XVI', 'XVII', 'XVIII', 'XIX', 'XX', 'XXI', 'XXII', 'XXIII')},
+}
+
+def legacy_parse_hungarian_address(address: str) -> str:
+    if not address or not address.strip():
+        return ""
+    addr = address.strip()
+    postal_pattern = r'(\d{4})\s*([A-ZÁÉÍÓÖŐÚÜŰ][a-záéíóöőúüű\s]+)'
+    match = re.search(postal_pattern, addr)
+    if match:
+        postal_code, city = match.groups()
+        addr = f"{postal_code} {city.strip()}"
+    for pattern, replacement in _LEGACY_ABBREVIATIONS.items():
+        addr = re.sub(pattern, replacement, addr, flags=re.IGNORECASE)
+    addr = re.sub(r'\s+', ' ', addr).strip()
+    return addr
+
+_STREETS = ["Nádor", "Andrássy", "Kossuth Lajos", "Petőfi", "Október 6.", "Váci", "Rákóczi",
+            "Kárász", "Szent István", "Bajcsy-Zsilinszky", "Üllői", "Dózsa György"]
+_KINDS = ["u.", "utca", "ut", "út", "UT", "krt", "krt.", "körút", "sgt", "SGT", "tér", "tere", "köz"]
+_CITIES = ["Budapest", "Szeged", "Debrecen", "Győr", "Érd", "Pécs", "budapest"]
+_DISTRICTS = ["V. ker", "V.ker", "XIII. ker.", "ker", "VIII.  ker", "xi. ker", "II. kerület"]
+_EXTRAS = ["", "", " 2. em. 5.", " fszt.", " (kapucsengő 12)", " Nyugati pl", " Keleti pu.", " vasútáll",
+           " áll", " pl."]
+
+def _corpus(size: int, seed: int = 16) -> List[str]:
+    rng = random.Random(seed)
+    out = ["", "   ", "Budapest", "1051", "Szeged 6720", "6720 Szeged, Kárász u. 8",
+           "1051 Budapest, Nádor u. 5", "Budapest 1051 Nádor utca 5"]
+    for _ in range(size):
+        street = f"{rng.choice(_STREETS)} {rng.choice(_KINDS)} {rng.randint(1, 180)}{rng.choice(['', '/A', 'b'])}"
+        city = rng.choice(_CITIES)
+        postal = f"{rng.randint(1011, 9999)}"
+        shape = rng.randrange(6)
+        if shape == 0:
+            addr = f"{postal} {city}, {street}"
+        elif shape == 1:
+            addr = f"{city}, {street}"
+        elif shape == 2:
+            addr = f"{city} {rng.choice(_DISTRICTS)}, {street}"
+        elif shape == 3:
+            addr = f"{street}, {postal}{city}"
+        elif shape == 4:
+            addr = f"  {street}  {rng.choice(_DISTRICTS)}\t{city} "
+        else:
+            addr = f"{city.lower()} {postal}, {street.upper()}"
+        out.append(addr + rng.choice(_EXTRAS))
+    return out
+
+CORPUS = _corpus(3000)
+
+def test_matches_legacy_on_corpus():
+    mismatches = [(a, legacy_parse_hungarian_address(a), parse_hungarian_address(a))
+                  for a in CORPUS if legacy_parse_hungarian_address(a) != parse_hungarian_address(a)]
+    assert not mismatches, mismatches[:5]
+
+def test_batch_matches_single():
+    assert parse_hungarian_addresses(CORPUS[:200]) == [parse_hungarian_address(a) for a in CORPUS[:200]]
+
+@pytest.mark.parametrize("address, expected", [
+    ("1051 Budapest, Nádor u. 5", "1051 Budapest"),
+    ("Andrássy ut 12", "Andrássy utca 12"),
+    ("Nagykörút  krt 3", "Nagykörút körút 3"),
+    ("Szeged, Tisza Lajos SGT 40", "Szeged, Tisza Lajos sugárút 40"),
+    ("", ""),
+])
+def test_examples(address, expected):
+    assert parse_hungarian_address(address) == expected
+
+def test_expand_abbreviations_keeps_street():
+    assert expand_abbreviations(" 1051 Budapest,  Nádor ut 5 ") == "1051 Budapest, Nádor utca 5"
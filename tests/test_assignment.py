@@ -0,0 +1,66 @@
+# tests/test_assignment.py
+"""
+solve_assignment a brute force optimum ellen kis (négyzetes és téglalap alakú) mátrixokon,
+NumPy-val és a tiszta Python ággal is, valamint a 200 x 200 futár-rendelés mátrix futásideje.
+"""
+import itertools
+import random
+import time
+
+import pytest
+
+from utils import assignment
+from utils.assignment import solve_assignment
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if assignment.np is None:
+            pytest.skip("numpy nincs telepítve")
+    else:
+        monkeypatch.setattr(assignment, "np", None)
+    return request.param
+
+def _total(cost, pairs):
+    return sum(cost[i][j] for i, j in pairs)
+
+def _brute_force(cost) -> float:
+    rows, cols = len(cost), len(cost[0])
+    if rows <= cols:
+        return min(sum(cost[i][j] for i, j in enumerate(perm))
+                   for perm in itertools.permutations(range(cols), rows))
+    return min(sum(cost[i][j] for j, i in enumerate(perm))
+               for perm in itertools.permutations(range(rows), cols))
+
+def _matrix(rng, rows, cols, integer):
+    if integer:
+        # sok azonos költség: holtversenyek
+        return [[rng.randint(0, 5) for _ in range(cols)] for _ in range(rows)]
+    return [[rng.uniform(0.1, 15.0) for _ in range(cols)] for _ in range(rows)]
+
+SHAPES = [(1, 1), (1, 4), (4, 1), (2, 2), (3, 3), (3, 5), (5, 3), (4, 6), (6, 4), (6, 6), (2, 7), (7, 2)]
+
+@pytest.mark.parametrize("rows, cols", SHAPES)
+def test_matches_brute_force(backend, rows, cols):
+    rng = random.Random(rows * 100 + cols)
+    for trial in range(15):
+        cost = _matrix(rng, rows, cols, integer=trial % 3 == 0)
+        pairs = solve_assignment(cost)
+        assert len(pairs) == min(rows, cols)
+        assert len({i for i, _ in pairs}) == len(pairs)
+        assert len({j for _, j in pairs}) == len(pairs)
+        assert pairs == sorted(pairs)
+        assert _total(cost, pairs) == pytest.approx(_brute_force(cost))
+
+def test_empty(backend):
+    assert solve_assignment([]) == []
+    assert solve_assignment([[]]) == []
+
+def test_200x200_is_fast(backend):
+    rng = random.Random(19)
+    cost = _matrix(rng, 200, 200, integer=False)
+    started = time.perf_counter()
+    pairs = solve_assignment(cost)
+    elapsed = time.perf_counter() - started
+    assert len(pairs) == 200
+    assert elapsed < 0.5, f"{elapsed:.3f} s"
@@ -0,0 +1,47 @@
+# tests/test_gazetteer.py
+"""Helyi gazetteer egy kis fixture címadatbázisból (tests/fixtures/gazetteer.csv)"""
+import os
+
+import pytest
+
+from utils.gazetteer import Gazetteer, import_csv
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "gazetteer.csv")
+
+@pytest.fixture()
+def gazetteer(tmp_path):
+    db_path = str(tmp_path / "gazetteer.db")
+    assert import_csv(FIXTURE, db_path) == 5
+    g = Gazetteer(db_path)
+    yield g
+    g.close()
+
+@pytest.mark.parametrize("address", [
+    "1051 Budapest, Nádor u. 5",
+    "Budapest, Nádor utca 5.",
+    "Nádor utca 5, 1051 Budapest",
+])
+def test_street_and_house_number(gazetteer, address):
+    # páratlan oldal 1..21 között interpolálva: (5 - 1) / 20 = 0.2
+    assert gazetteer.lookup(address) == pytest.approx((47.502, 19.05))
+
+def test_even_side_and_abbreviated_street_type(gazetteer):
+    assert gazetteer.lookup("1051 Budapest, Nádor u. 20") == pytest.approx((47.51, 19.0502))
+    assert gazetteer.lookup("6720 Szeged, Kárász utca 8") == pytest.approx((46.254, 20.148))
+
+def test_postal_code_and_settlement_fallback(gazetteer):
+    # utca nélküli cím: az irányítószám (illetve a település) pontjainak átlaga
+    assert gazetteer.lookup("1051 Budapest") == pytest.approx((47.500667, 19.050733), abs=1e-6)
+    assert gazetteer.lookup("Szeged") == pytest.approx((46.2535, 20.1485), abs=1e-6)
+
+@pytest.mark.parametrize("address", [
+    "1051 Budapest, Ismeretlen utca 3",   # utcás címre nem ad irányítószám középpontot
+    "1051 Budapest, Nádor utca 99",       # a legközelebbi ismert házszám is túl messze van
+    "9999 Sehol",
+    "",
+])
+def test_miss(gazetteer, address):
+    assert gazetteer.lookup(address) is None
+
+def test_missing_database(tmp_path):
+    assert Gazetteer(str(tmp_path / "nincs.db")).lookup("1051 Budapest, Nádor u. 5") is None
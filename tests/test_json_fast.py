@@ -0,0 +1,33 @@
+# tests/test_json_fast.py
+"""dumps_rows: a tuple sorok kódolása ugyanazt a JSON-t adja, mint a dict-es út (mindkét backenddel)"""
+import json
+
+import pytest
+
+from utils import json_fast
+
+COLUMNS = ["id", "restaurant_name", "order_details", "estimated_time", "lat", "status"]
+ROWS = [
+    (1, "Pizzéria \"Nápoly\"", "100% kp\n2 db", None, 47.4979, "pending"),
+    (2, "Gyros & Co", "emelet: 3/12, csengő: \u00e9", 25, None, "accepted"),
+    (3, "", "", 0, -0.5, "picked_up"),
+]
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_fast, "orjson", None)
+    elif json_fast.orjson is None:
+        pytest.skip("orjson nincs telepítve")
+    return request.param
+
+def test_rows_match_dict_encoding(backend):
+    encoded = json_fast.dumps_rows(COLUMNS, ROWS)
+    assert json.loads(encoded) == [dict(zip(COLUMNS, row)) for row in ROWS]
+
+def test_empty_rows(backend):
+    assert json_fast.dumps_rows(COLUMNS, []) == b"[]"
+
+def test_wrap_rows(backend):
+    wrapped = json_fast.wrap_rows(json_fast.dumps_rows(COLUMNS, ROWS[:1]), ok=True)
+    assert json.loads(wrapped) == {"ok": True, "orders": [dict(zip(COLUMNS, ROWS[0]))]}
@@ -0,0 +1,34 @@
+# tests/test_order_cache.py
+"""
+Rendelés lista ETag-ek: változatlan listára 304, de egy másik lista (vagy futár)
+ETag-je ugyanannál a rendelés verziónál sem ad 304-et.
+"""
+import importlib
+
+import pytest
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    # import előtt az ideiglenes könyvtárba: a globális adatbázis példány ne a repó fájlját nyissa meg
+    monkeypatch.chdir(tmp_path)
+    app_module = importlib.import_module("web_app.app")
+    return app_module.create_app().test_client()
+
+def test_same_list_revalidates(client):
+    first = client.get("/api/orders")
+    assert first.status_code == 200
+    again = client.get("/api/orders", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+def test_etag_is_scoped_to_the_list(client):
+    etag = client.get("/api/orders").headers["ETag"]
+    pending = client.get("/api/orders_by_status?status=pending", headers={"If-None-Match": etag})
+    assert pending.status_code == 200
+    assert pending.headers["ETag"] != etag
+
+def test_etag_is_scoped_to_the_courier(client):
+    url = "/api/orders_by_status?status=accepted&courier_id={}"
+    etag = client.get(url.format(101)).headers["ETag"]
+    other = client.get(url.format(102), headers={"If-None-Match": etag})
+    assert other.status_code == 200
@@ -0,0 +1,67 @@
+# tests/test_order_status.py
+"""
+update_order_status: a kiszállítás pontosan egyszer kerül a heti összesítőkbe
+(ismételt és párhuzamos "delivered" jelölésnél is), és a delivered_at nem íródik felül.
+"""
+import importlib
+import threading
+
+import pytest
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    # import előtt az ideiglenes könyvtárba: a modul globális példánya ne a repó adatbázisát nyissa meg
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("database.db_manager")
+    monkeypatch.setattr(module, "DB_NAME", str(tmp_path / "status.db"))
+    manager = module.DatabaseManager()
+    yield manager
+    manager.close()
+
+def _order(db, status="pending"):
+    with db.transaction() as cur:
+        cur.execute("""
+            INSERT INTO orders(restaurant_name, restaurant_address, phone_number, order_details,
+                               group_id, group_name, message_id, status)
+            VALUES ('Teszt étterem', 'Példa utca 1', '', '', -1, 'Teszt étterem', 1, ?)
+        """, (status,))
+        return cur.lastrowid
+
+def _stats(db):
+    with db.connection() as conn:
+        courier = [tuple(r) for r in conn.execute("SELECT delivery_partner_id, cnt FROM weekly_courier_stats")]
+        restaurant = [tuple(r) for r in conn.execute("SELECT group_name, cnt FROM weekly_restaurant_stats")]
+    return courier, restaurant
+
+def _delivered_at(db, order_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT delivered_at FROM orders WHERE id = ?", (order_id,)).fetchone()[0]
+
+def test_repeated_delivered_counts_once(db):
+    order_id = _order(db)
+    db.update_order_status(order_id, "accepted", partner_id=7, partner_name="Futár")
+    db.update_order_status(order_id, "delivered")
+    with db.transaction() as cur:
+        cur.execute("UPDATE orders SET delivered_at = '2026-01-05 12:00:00' WHERE id = ?", (order_id,))
+
+    db.update_order_status(order_id, "delivered")
+    assert _delivered_at(db, order_id) == "2026-01-05 12:00:00"
+    assert _stats(db) == ([(7, 1)], [("Teszt étterem", 1)])
+
+def test_concurrent_delivered_counts_once(db):
+    order_id = _order(db)
+    db.update_order_status(order_id, "accepted", partner_id=7, partner_name="Futár")
+    threads = [threading.Thread(target=db.update_order_status, args=(order_id, "delivered")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _stats(db) == ([(7, 1)], [("Teszt étterem", 1)])
+
+def test_status_event_has_previous_status(db):
+    events = []
+    db.add_listener(events.append)
+    order_id = _order(db)
+    db.update_order_status(order_id, "accepted", partner_id=7)
+    db.update_order_status(order_id, "accepted", partner_id=7)  # nincs változás - nincs esemény
+    assert [(e["from_status"], e["order"]["status"]) for e in events] == [("pending", "accepted")]
@@ -0,0 +1,54 @@
+# tests/test_query_plans.py
+"""
+A forró rendelés lekérdezések indexet használnak-e (EXPLAIN QUERY PLAN).
+Ideiglenes adatbázis, az init_db sémájával - ha egy séma vagy lekérdezés módosítás
+elveszíti az indexet (vagy ideiglenes rendező B-fát igényel), a teszt elbukik.
+"""
+import importlib
+
+import pytest
+
+@pytest.fixture()
+def db_module(tmp_path, monkeypatch):
+    # import előtt az ideiglenes könyvtárba: a modul globális példánya ne a repó adatbázisát nyissa meg
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("database.db_manager")
+    monkeypatch.setattr(module, "DB_NAME", str(tmp_path / "plans.db"))
+    return module
+
+@pytest.fixture()
+def db(db_module):
+    manager = db_module.DatabaseManager()
+    with manager.transaction() as cur:
+        cur.execute("INSERT INTO groups(id, name) VALUES (-1, 'Teszt étterem')")
+        # sok lezárt és kevés nyitott rendelés, mint élesben
+        for i in range(300):
+            status = ("pending", "accepted", "picked_up")[i % 3] if i % 10 == 0 else "delivered"
+            cur.execute("""
+                INSERT INTO orders(restaurant_name, restaurant_address, phone_number, order_details,
+                                   group_id, group_name, message_id, status, delivery_partner_id, created_at)
+                VALUES ('Teszt étterem', ?, '', '', -1, 'Teszt étterem', ?, ?, ?, datetime('now', ?))
+            """, (f"Példa utca {i}", i, status, None if status == "pending" else 100 + i % 7,
+                  f"-{i} minutes"))
+    manager.init_db()  # ANALYZE a feltöltött táblán
+    yield manager
+    manager.close()
+
+def _plan(db, sql, params=()):
+    with db.connection() as conn:
+        return " | ".join(row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+@pytest.mark.parametrize("sql_name, params, index", [
+    ("_OPEN_ORDERS_SQL", (), "idx_orders_open_created"),
+    ("_PENDING_ORDERS_SQL", (), "idx_orders_status_created"),
+    ("_PARTNER_ORDERS_SQL", ("accepted", 101), "idx_orders_partner_status_created"),
+])
+def test_order_lists_use_index(db_module, db, sql_name, params, index):
+    plan = _plan(db, getattr(db_module, sql_name), params)
+    assert index in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+def test_partner_order_count_uses_index(db):
+    plan = _plan(db, "SELECT COUNT(*) FROM orders WHERE delivery_partner_id = ? AND status = ?",
+                 (101, "delivered"))
+    assert "idx_orders_partner_status_created" in plan, plan
@@ -0,0 +1,69 @@
+# tests/test_route_optimizer.py
+"""Útvonal sorrend: Held-Karp a teljes kereséssel összevetve, felvétel-leadás sorrendi feltétellel"""
+import itertools
+import random
+
+import pytest
+
+from utils.route_optimizer import HELD_KARP_MAX_STOPS, path_length, solve_path
+
+def _random_matrix(rng: random.Random, n: int):
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(n)]
+    return [[((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 for bx, by in points] for ax, ay in points]
+
+def _feasible(order, start=None, end=None, precedence=None):
+    if start is not None and order[0] != start:
+        return False
+    if end is not None and order[-1] != end:
+        return False
+    position = {node: i for i, node in enumerate(order)}
+    return all(position[p] < position[k] for k, before in (precedence or {}).items() for p in before)
+
+def _brute_force(dist, start=None, end=None, precedence=None):
+    return min(path_length(dist, order)
+               for order in itertools.permutations(range(len(dist)))
+               if _feasible(order, start, end, precedence))
+
+def _pickup_delivery(rng: random.Random, n: int, start=None):
+    """Véletlen felvétel -> leadás párok (a rögzített kezdőpont nem lehet leadás)"""
+    nodes = [i for i in range(n) if i != start]
+    rng.shuffle(nodes)
+    return {nodes[i + 1]: [nodes[i]] for i in range(0, len(nodes) - 1, 2)}
+
+@pytest.mark.parametrize("n", range(3, 9))
+def test_held_karp_matches_brute_force(n):
+    rng = random.Random(n)
+    for _ in range(5):
+        dist = _random_matrix(rng, n)
+        order = solve_path(dist)
+        assert sorted(order) == list(range(n))
+        assert path_length(dist, order) == pytest.approx(_brute_force(dist))
+
+@pytest.mark.parametrize("n", range(3, 9))
+def test_held_karp_with_fixed_ends(n):
+    rng = random.Random(100 + n)
+    for _ in range(5):
+        dist = _random_matrix(rng, n)
+        order = solve_path(dist, start=0, end=n - 1)
+        assert _feasible(order, 0, n - 1)
+        assert path_length(dist, order) == pytest.approx(_brute_force(dist, 0, n - 1))
+
+@pytest.mark.parametrize("n", range(3, 9))
+def test_held_karp_pickup_before_delivery(n):
+    rng = random.Random(200 + n)
+    for _ in range(5):
+        dist = _random_matrix(rng, n)
+        precedence = _pickup_delivery(rng, n, start=0)
+        order = solve_path(dist, start=0, precedence=precedence)
+        assert _feasible(order, 0, None, precedence)
+        assert path_length(dist, order) == pytest.approx(_brute_force(dist, 0, None, precedence))
+
+def test_local_search_keeps_precedence():
+    # HELD_KARP_MAX_STOPS fölött a heurisztika fut: teljes, érvényes sorrend kell
+    rng = random.Random(7)
+    n = HELD_KARP_MAX_STOPS + 9
+    dist = _random_matrix(rng, n)
+    precedence = _pickup_delivery(rng, n, start=0)
+    order = solve_path(dist, start=0, time_budget=0.2, precedence=precedence)
+    assert sorted(order) == list(range(n))
+    assert _feasible(order, 0, None, precedence)
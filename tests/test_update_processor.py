@@ -0,0 +1,94 @@
+# tests/test_update_processor.py
+"""
+ChatLaneUpdateProcessor próbapad: sok csoportból érkező szintetikus update-ek,
+chatenkénti sorrend, párhuzamossági korlát és rögzítési késleltetés.
+
+Tesztként:      python -m pytest -q tests/test_update_processor.py
+Mérésként:      python tests/test_update_processor.py [csoportok] [üzenet/csoport] [korlát]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from telegram import Chat, Message, Update, User
+
+# közvetlen futtatáskor is a repó gyökeréből importáljon
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram_bot.update_processor import ChatLaneUpdateProcessor
+
+SLOW_CHAT_ID = -1  # ez a csoport lassú (pl. lassú DB írás / reply_text)
+
+def _updates(groups: int, per_group: int) -> List[Update]:
+    """Körbeforgó érkezés: minden csoportból az n. üzenet, majd az n+1., ..."""
+    updates = []
+    for n in range(per_group):
+        for g in range(1, groups + 1):
+            uid = len(updates) + 1
+            message = Message(uid, None, Chat(-g, Chat.SUPERGROUP), text=str(n), from_user=User(g, "u", False))
+            updates.append(Update(uid, message=message))
+    return updates
+
+async def _run(groups: int, per_group: int, max_concurrent: int,
+               fast_delay: float = 0.005, slow_delay: float = 0.2) -> Dict:
+    processor = ChatLaneUpdateProcessor(max_concurrent, max_pending=groups * per_group)
+    seen: Dict[int, List[int]] = {}
+    latencies: List[float] = []
+    received: Dict[int, float] = {}
+    state = {"running": 0, "max_running": 0}
+
+    async def handler(update: Update) -> None:
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            chat_id = update.effective_chat.id
+            await asyncio.sleep(slow_delay if chat_id == SLOW_CHAT_ID else fast_delay)
+            seen.setdefault(chat_id, []).append(int(update.message.text))
+            if chat_id != SLOW_CHAT_ID:
+                latencies.append(time.perf_counter() - received[update.update_id])
+        finally:
+            state["running"] -= 1
+
+    async with processor:
+        # mint a PTB Application: update-enként egy task, érkezési sorrendben
+        tasks = []
+        for update in _updates(groups, per_group):
+            received[update.update_id] = time.perf_counter()
+            tasks.append(asyncio.create_task(processor.process_update(update, handler(update))))
+        await asyncio.gather(*tasks)
+
+    latencies.sort()
+    return {
+        "ordered": all(v == sorted(v) for v in seen.values()),
+        "processed": sum(len(v) for v in seen.values()),
+        "max_running": state["max_running"],
+        "lanes_left": processor.active_lanes,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+def test_chat_order_and_concurrency_limit():
+    result = asyncio.run(_run(groups=30, per_group=20, max_concurrent=8, slow_delay=0.02))
+    assert result["processed"] == 600
+    assert result["ordered"]
+    assert result["max_running"] == 8
+    assert result["lanes_left"] == 0
+
+def test_slow_chat_does_not_block_others():
+    # a lassú csoport 20 x 50 ms = 1 s; a többi csoport ennél jóval hamarabb végez
+    result = asyncio.run(_run(groups=10, per_group=20, max_concurrent=4, slow_delay=0.05))
+    assert result["ordered"]
+    assert result["max_ms"] < 700, result
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    groups, per_group, limit = args + [50, 20, 32][len(args):]
+    result = asyncio.run(_run(groups, per_group, limit))
+    print(f"{groups} csoport x {per_group} üzenet, korlát {limit}: "
+          f"sorrend {'OK' if result['ordered'] else 'HIBÁS'}, max párhuzamos {result['max_running']}, "
+          f"rögzítés p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, max {result['max_ms']:.0f} ms "
+          f"(a lassú csoport nélkül)")
@@ -1,6 +1,36 @@
 # utils/address_parser.py
 import re
+from functools import lru_cache
+from typing import Iterable, List
 
+# Magyar rövidítések felismerése és kibővítése (sorrend = illesztési sorrend)
+# A "ker." és a "V. ker" típusú kerület minták korábban sosem illeszkedtek (a puszta "ker"
+# csere megelőzte őket), ezért nincsenek itt - a kimenet ugyanaz.
+ABBREVIATIONS = (
+    ('sgt', 'sugárút'),
+    ('krt', 'körút'),
+    ('ut', 'utca'),
+    ('út', 'utca'),
+    ('tér', 'tér'),
+    ('pl', 'pályaudvar'),
+    ('áll', 'állomás'),
+    ('ker', 'kerület'),
+)
+
+# Egyetlen, import időben fordított minta: alternatívánként egy csoport, a csoport indexe adja a cserét
+_ABBREV_RE = re.compile(
+    "|".join(rf"\b({re.escape(abbr)})\b" for abbr, _ in ABBREVIATIONS),
+    re.IGNORECASE,
+)
+_REPLACEMENTS = [None] + [full for _, full in ABBREVIATIONS]
+
+_POSTAL_RE = re.compile(r'(\d{4})\s*([A-ZÁÉÍÓÖŐÚÜŰ][a-záéíóöőúüű\s]+)')
+_SPACES_RE = re.compile(r'\s+')
+
+def _expand(match: "re.Match[str]") -> str:
+    return _REPLACEMENTS[match.lastindex]
+
+@lru_cache(maxsize=4096)
 def parse_hungarian_address(address: str) -> str:
     """
     Magyar cím parser - rövidítések és irányítószámok felismerése
@@ -13,52 +43,29 @@ def parse_hungarian_address(address: str) -> str:
     # Irányítószám felismerés és normalizálás
     # "1051 Budapest" -> "1051 Budapest"
     # "Budapest 1051" -> "1051 Budapest"
-    postal_pattern = r'(\d{4})\s*([A-ZÁÉÍÓÖŐÚÜŰ][a-záéíóöőúüű\s]+)'
-    match = re.search(postal_pattern, addr)
+    match = _POSTAL_RE.search(addr)
     if match:
         postal_code, city = match.groups()
         addr = f"{postal_code} {city.strip()}"
     
-    # Magyar rövidítések felismerése és kibővítése
-    abbreviations = {
-        r'\bsgt\b': 'sugárút',
-        r'\bkrt\b': 'körút', 
-        r'\but\b': 'utca',
-        r'\bút\b': 'utca',
-        r'\btér\b': 'tér',
-        r'\bpl\b': 'pályaudvar',
-        r'\báll\b': 'állomás',
-        r'\bker\b': 'kerület',
-        r'\bker\.\b': 'kerület',
-        r'\bV\.\s*ker\b': 'V. kerület',
-        r'\bI\.\s*ker\b': 'I. kerület',
-        r'\bII\.\s*ker\b': 'II. kerület',
-        r'\bIII\.\s*ker\b': 'III. kerület',
-        r'\bIV\.\s*ker\b': 'IV. kerület',
-        r'\bVI\.\s*ker\b': 'VI. kerület',
-        r'\bVII\.\s*ker\b': 'VII. kerület',
-        r'\bVIII\.\s*ker\b': 'VIII. kerület',
-        r'\bIX\.\s*ker\b': 'IX. kerület',
-        r'\bX\.\s*ker\b': 'X. kerület',
-        r'\bXI\.\s*ker\b': 'XI. kerület',
-        r'\bXII\.\s*ker\b': 'XII. kerület',
-        r'\bXIII\.\s*ker\b': 'XIII. kerület',
-        r'\bXIV\.\s*ker\b': 'XIV. kerület',
-        r'\bXV\.\s*ker\b': 'XV. kerület',
-        r'\bXVI\.\s*ker\b': 'XVI. kerület',
-        r'\bXVII\.\s*ker\b': 'XVII. kerület',
-        r'\bXVIII\.\s*ker\b': 'XVIII. kerület',
-        r'\bXIX\.\s*ker\b': 'XIX. kerület',
-        r'\bXX\.\s*ker\b': 'XX. kerület',
-        r'\bXXI\.\s*ker\b': 'XXI. kerület',
-        r'\bXXII\.\s*ker\b': 'XXII. kerület',
-        r'\bXXIII\.\s*ker\b': 'XXIII. kerület'
-    }
-    
-    for pattern, replacement in abbreviations.items():
-        addr = re.sub(pattern, replacement, addr, flags=re.IGNORECASE)
+    # Rövidítések kibővítése egy menetben
+    addr = _ABBREV_RE.sub(_expand, addr)
     
     # Dupla szóközök eltávolítása
-    addr = re.sub(r'\s+', ' ', addr).strip()
+    addr = _SPACES_RE.sub(' ', addr).strip()
     
     return addr
+
+@lru_cache(maxsize=4096)
+def expand_abbreviations(address: str) -> str:
+    """
+    Csak a rövidítések kibővítése és a szóközök rendezése - az irányítószám átrendezés nélkül,
+    így az utca és a házszám megmarad (a helyi gazetteer ebből keres)
+    """
+    if not address or not address.strip():
+        return ""
+    return _SPACES_RE.sub(' ', _ABBREV_RE.sub(_expand, address.strip())).strip()
+
+def parse_hungarian_addresses(addresses: Iterable[str]) -> List[str]:
+    """Több cím normalizálása (az ismétlődő címek a memóból jönnek)"""
+    return [parse_hungarian_address(a) for a in addresses]
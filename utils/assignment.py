@@ -0,0 +1,114 @@
+# utils/assignment.py
+from typing import List, Sequence, Tuple
+
+# Opcionális: NumPy-val a belső ciklus soronként egy vektorizált lépés
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def solve_assignment(cost) -> List[Tuple[int, int]]:
+    """
+    Minimális összköltségű hozzárendelés (magyar módszer, legrövidebb javító utas O(n^2 * m) változat).
+    `cost[i][j]`: i. sor (pl. futár) j. oszlophoz (pl. rendelés) rendelésének költsége; téglalap alakú is lehet,
+    ilyenkor min(sorok, oszlopok) pár készül. Visszatérés: [(sor, oszlop)] sor szerint rendezve.
+    """
+    rows = len(cost)
+    cols = len(cost[0]) if rows else 0
+    if rows == 0 or cols == 0:
+        return []
+
+    # az algoritmus sorok <= oszlopok esetre szól - különben a transzponálton fut
+    if rows > cols:
+        if np is not None:
+            transposed = np.asarray(cost, dtype=float).T
+        else:
+            transposed = [list(col) for col in zip(*cost)]
+        return sorted((i, j) for j, i in solve_assignment(transposed))
+
+    if np is not None:
+        return _hungarian_numpy(np.asarray(cost, dtype=float))
+    return _hungarian_python(cost)
+
+def _hungarian_numpy(cost) -> List[Tuple[int, int]]:
+    n, m = cost.shape
+    inf = float("inf")
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)  # match[j]: j. oszlophoz rendelt sor (1-től), 0 = szabad
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used
+            free[0] = False
+            # csökkentett költségek a még nem érintett oszlopokra, egy lépésben
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv, inf)
+            j1 = int(np.argmin(candidates))
+            delta = candidates[j1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    return sorted((int(match[j]) - 1, j - 1) for j in range(1, m + 1) if match[j])
+
+def _hungarian_python(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    n, m = len(cost), len(cost[0])
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta, j1 = inf, 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                reduced = row[j - 1] - ui0 - v[j]
+                if reduced < minv[j]:
+                    minv[j] = reduced
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    return sorted((match[j] - 1, j - 1) for j in range(1, m + 1) if match[j])
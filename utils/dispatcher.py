@@ -0,0 +1,108 @@
+# utils/dispatcher.py
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from telegram.helpers import escape_markdown
+
+from config.settings import (
+    DISPATCH_INTERVAL_SECONDS, DISPATCH_MAX_DISTANCE_KM, DISPATCH_ACTIVE_HOURS
+)
+from database.db_manager import db
+from utils.assignment import solve_assignment
+from utils.geocoding import distance_matrix
+
+logger = logging.getLogger(__name__)
+
+class Dispatcher:
+    """
+    Időszakos kiosztási javaslatok: az elérhető rendeléseket és a szabad futárokat
+    minimális összes odaút szerint párosítja (magyar módszer), és a futárnak privát üzenetben
+    (az értesítés outboxon át) javasolja a hozzá legjobban illő rendelést.
+    Az elfogadás továbbra is a futáron múlik.
+    """
+
+    def __init__(self, interval: float = DISPATCH_INTERVAL_SECONDS,
+                 max_distance_km: float = DISPATCH_MAX_DISTANCE_KM) -> None:
+        self.interval = interval
+        self.max_distance_km = max_distance_km
+        self._suggested: Dict[int, int] = {}  # futár -> utoljára javasolt rendelés (ne ismételjük)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Dispatch round failed: {e}")
+
+    def compute(self, couriers: List[Dict], orders: List[Dict]) -> List[Dict]:
+        """
+        Futár-rendelés párok (lat/lon mezős dict-ekből): [{"courier", "order", "distance_km"}].
+        A `max_distance_km`-nél messzebbi párok nagy büntetést kapnak, és kimaradnak a javaslatok közül.
+        """
+        if not couriers or not orders:
+            return []
+        nc = len(couriers)
+        points = [(c["lat"], c["lon"]) for c in couriers] + [(o["lat"], o["lon"]) for o in orders]
+        dist = distance_matrix(points, as_array=True)
+        if isinstance(dist, list):
+            dist = [row[nc:] for row in dist[:nc]]
+            cost = [[d if d <= self.max_distance_km else d + 1e6 for d in row] for row in dist]
+        else:
+            dist = dist[:nc, nc:]
+            cost = dist + (dist > self.max_distance_km) * 1e6
+
+        pairs = []
+        for i, j in solve_assignment(cost):
+            d = float(dist[i][j])
+            if d <= self.max_distance_km:
+                pairs.append({"courier": couriers[i], "order": orders[j], "distance_km": d})
+        return pairs
+
+    def run_once(self) -> int:
+        """Egy kiosztási kör; visszatérés: kiküldött (új) javaslatok száma"""
+        started = time.perf_counter()
+        couriers = db.get_idle_couriers(DISPATCH_ACTIVE_HOURS)
+        orders = db.get_dispatch_orders()
+        pairs = self.compute(couriers, orders)
+
+        sent = 0
+        suggested = {}
+        for pair in pairs:
+            courier_id = pair["courier"]["delivery_partner_id"]
+            order = pair["order"]
+            suggested[courier_id] = order["id"]
+            if self._suggested.get(courier_id) == order["id"]:
+                continue
+            text = (
+                "🧭 **AJÁNLOTT RENDELÉS**\n\n"
+                f"🏪 **Étterem:** {escape_markdown(order['restaurant_name'] or order['group_name'] or '')}\n"
+                f"📍 **Cím:** {escape_markdown(order['restaurant_address'] or '')}\n"
+                f"📏 **Távolság a felvételig:** {pair['distance_km']:.1f} km\n"
+                f"📋 **Rendelés ID:** #{order['id']}\n"
+            )
+            db.enqueue_notification(courier_id, text)
+            sent += 1
+        self._suggested = suggested
+
+        if couriers and orders:
+            logger.info(f"Dispatch: {len(couriers)} couriers x {len(orders)} orders -> "
+                        f"{len(pairs)} pairs, {sent} new suggestions "
+                        f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return sent
+
+# Globális javaslattevő
+dispatcher = Dispatcher()
@@ -0,0 +1,306 @@
+# utils/gazetteer.py
+import os
+import re
+import csv
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import GAZETTEER_DB
+from utils.address_parser import expand_abbreviations
+
+logger = logging.getLogger(__name__)
+
+# Utcatípusok (a rövidítések kibővítése utáni alakban, pl. "út" -> "utca")
+STREET_TYPES = {
+    "utca", "út", "körút", "sugárút", "tér", "tere", "köz", "sor", "sétány", "fasor",
+    "rakpart", "park", "liget", "lépcső", "dűlő", "lakótelep", "udvar", "útja", "pályaudvar",
+}
+_STREET_NAME_MAX_WORDS = 4     # ennyi szó lehet a típus előtt (pl. "bajcsy zsilinszky" + "út")
+_HOUSE_NUMBER_MAX_GAP = 6      # ennél távolabbi ismert házszám már nem elég pontos
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_POSTAL_RE = re.compile(r"\b(\d{4})\b")
+_HOUSE_NUMBER_RE = re.compile(r"^\W*(\d+)")
+_DISTRICT_RE = re.compile(r"\b([ivxl]+)\.?\s*kerület", re.IGNORECASE)
+_UTCA_SHORT_RE = re.compile(r"\bu\b", re.IGNORECASE)   # "Nádor u. 5" -> "Nádor utca. 5"
+
+# CSV oszlopnevek: saját formátum és OSM cím export (osmium / Overpass csv) is
+_COLUMN_ALIASES = {
+    "postal_code": ("postal_code", "addr:postcode", "postcode"),
+    "settlement": ("settlement", "addr:city", "city"),
+    "district": ("district", "addr:district", "addr:suburb"),
+    "street": ("street", "addr:street"),
+    "hn_from": ("hn_from", "addr:housenumber", "housenumber"),
+    "hn_to": ("hn_to",),
+    "parity": ("parity",),
+    "lat": ("lat", "@lat", "::lat", "latitude"),
+    "lon": ("lon", "@lon", "::lon", "lng", "longitude"),
+    "lat_to": ("lat_to",),
+    "lon_to": ("lon_to",),
+}
+
+_SCHEMA = """
+    CREATE TABLE address_ranges (
+        postal_code TEXT,
+        settlement TEXT,
+        district TEXT,
+        street TEXT NOT NULL,
+        hn_from INTEGER,
+        hn_to INTEGER,
+        parity INTEGER NOT NULL DEFAULT 0,  -- 0: mind, 1: páratlan, 2: páros
+        lat REAL NOT NULL,
+        lon REAL NOT NULL,
+        lat_to REAL,                        -- tartomány vége (interpolációhoz), NULL = pont
+        lon_to REAL
+    );
+    CREATE TABLE areas (
+        postal_code TEXT,
+        settlement TEXT,
+        lat REAL NOT NULL,
+        lon REAL NOT NULL
+    );
+"""
+
+_INDEXES = """
+    CREATE INDEX idx_ranges_street ON address_ranges(street, settlement, hn_from);
+    CREATE INDEX idx_areas_postal ON areas(postal_code);
+    CREATE INDEX idx_areas_settlement ON areas(settlement);
+"""
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+def street_key(street: str) -> str:
+    """Utcanév kulcs: ugyanaz a normalizálás, mint a lekérdezett címeknél ("Nádor u." -> "nádor utca")"""
+    return " ".join(_words(_normalize(street)))
+
+def _normalize(text: str) -> str:
+    return _UTCA_SHORT_RE.sub("utca", expand_abbreviations(text).lower())
+
+def _settlement_key(settlement: str) -> str:
+    return " ".join(_words(settlement))
+
+def _house_number(value: str) -> Optional[int]:
+    match = _HOUSE_NUMBER_RE.match(value or "")
+    return int(match.group(1)) if match else None
+
+def _district_key(value: str) -> Optional[str]:
+    value = (value or "").strip().rstrip(".").upper()
+    return value or None
+
+# =============== IMPORT ===============
+def _read_rows(csv_path: str) -> Iterator[Tuple]:
+    """CSV sorok -> address_ranges sorok; a hiányos / hibás sorokat kihagyja"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        header = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        columns = {}
+        for field, aliases in _COLUMN_ALIASES.items():
+            columns[field] = next((header[a] for a in aliases if a in header), None)
+        if not columns["lat"] or not columns["lon"]:
+            raise ValueError(f"{csv_path}: lat/lon oszlop hiányzik")
+
+        def get(row: Dict[str, str], field: str) -> str:
+            name = columns[field]
+            return (row.get(name) or "").strip() if name else ""
+
+        skipped = 0
+        for row in reader:
+            try:
+                lat, lon = float(get(row, "lat")), float(get(row, "lon"))
+                parity = int(get(row, "parity") or 0)
+                lat_to = float(get(row, "lat_to")) if get(row, "lat_to") else None
+                lon_to = float(get(row, "lon_to")) if get(row, "lon_to") else None
+            except ValueError:
+                skipped += 1
+                continue
+            hn_from = _house_number(get(row, "hn_from"))
+            hn_to = _house_number(get(row, "hn_to")) or hn_from
+            yield (
+                get(row, "postal_code") or None,
+                _settlement_key(get(row, "settlement")) or None,
+                _district_key(get(row, "district")),
+                street_key(get(row, "street")),
+                hn_from,
+                hn_to,
+                parity,
+                lat,
+                lon,
+                lat_to,
+                lon_to,
+            )
+        if skipped:
+            logger.warning(f"Gazetteer import: {skipped} malformed rows skipped")
+
+def build_gazetteer(db_path: str, rows: Iterable[Tuple]) -> int:
+    """
+    Gazetteer adatbázis felépítése address_ranges sorokból (lásd _read_rows), majd atomikus csere:
+    egy futó folyamat a régi fájlt használja tovább, az új adat újraindítás után él.
+    Az utca nélküli sorok csak a település / irányítószám középpontjába számítanak bele.
+    Visszatérés: beírt sorok száma.
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(_SCHEMA)
+        with conn:
+            conn.executemany("INSERT INTO address_ranges VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            count = conn.execute("SELECT COUNT(*) FROM address_ranges").fetchone()[0]
+            # irányítószám / település középpontok egyszer, előre kiszámolva
+            conn.execute("""
+                INSERT INTO areas (postal_code, settlement, lat, lon)
+                SELECT postal_code, settlement, AVG(lat), AVG(lon)
+                FROM address_ranges
+                WHERE postal_code IS NOT NULL OR settlement IS NOT NULL
+                GROUP BY postal_code, settlement
+            """)
+            conn.execute("DELETE FROM address_ranges WHERE street = ''")
+        conn.executescript(_INDEXES)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    logger.info(f"Gazetteer built: {db_path} ({count} rows)")
+    return count
+
+def import_csv(csv_path: str, db_path: str) -> int:
+    """CSV / OSM cím export betöltése gazetteer adatbázisba"""
+    return build_gazetteer(db_path, _read_rows(csv_path))
+
+# =============== LEKÉRDEZÉS ===============
+class Gazetteer:
+    """
+    Helyi (offline) geokódoló egy előre felépített SQLite gazetteerből.
+    A bemenet a nyers cím (irányítószámmal, utcával, házszámmal); csak akkor ad
+    találatot, ha legalább olyan pontos, mint a kérdés (utcás címre nem ad településközéppontot).
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._missing = False
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._missing:
+            if not os.path.exists(self.db_path):
+                logger.info(f"No gazetteer at {self.db_path}, using network geocoding only")
+                self._missing = True
+                return None
+            self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        return self._conn
+
+    def lookup(self, address: str) -> Optional[Tuple[float, float]]:
+        """Koordináta a címhez, vagy None (nincs gazetteer / nincs elég pontos találat)"""
+        if not address:
+            return None
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                return self._lookup(conn, _normalize(address))
+            except sqlite3.Error as e:
+                logger.error(f"Gazetteer lookup error for '{address}': {e}")
+                return None
+
+    def _lookup(self, conn: sqlite3.Connection, text: str) -> Optional[Tuple[float, float]]:
+        postal_match = _POSTAL_RE.search(text)
+        postal = postal_match.group(1) if postal_match else None
+        district_match = _DISTRICT_RE.search(text)
+        district = district_match.group(1).upper() if district_match else None
+
+        words = _words(text)
+        type_idx = next((i for i, w in enumerate(words) if w in STREET_TYPES and i > 0), None)
+        if type_idx is None:
+            return self._lookup_area(conn, postal, words)
+
+        # utcanév jelöltek: a típus előtti 1..N szó (a település / kerület előtag kiesik)
+        candidates = [" ".join(words[j:type_idx + 1])
+                      for j in range(max(0, type_idx - _STREET_NAME_MAX_WORDS), type_idx)]
+        number_match = re.search(rf"\b{re.escape(words[type_idx])}\b\W*(\d+)", text)
+        house_number = int(number_match.group(1)) if number_match else None
+
+        rows = conn.execute(
+            f"SELECT street, postal_code, settlement, district, hn_from, hn_to, parity, "
+            f"lat, lon, lat_to, lon_to FROM address_ranges "
+            f"WHERE street IN ({','.join('?' * len(candidates))})",
+            candidates
+        ).fetchall()
+        if not rows:
+            return None
+
+        # leghosszabb illeszkedő utcanév, majd szűkítés irányítószámra / kerületre / településre
+        longest = max(len(r[0]) for r in rows)
+        rows = [r for r in rows if len(r[0]) == longest]
+        text_words = set(words)
+        for keep in (
+            lambda r: postal is not None and r[1] == postal,
+            lambda r: district is not None and r[3] == district,
+            lambda r: r[2] is not None and set(r[2].split()) <= text_words,
+        ):
+            narrowed = [r for r in rows if keep(r)]
+            if narrowed:
+                rows = narrowed
+        if len({(r[2], r[3]) for r in rows}) > 1:
+            return None  # több településen is van ilyen utca - nem tudjuk, melyik
+
+        if house_number is not None:
+            # a házszámot tartalmazó tartomány, különben a legközelebbi ismert házszám (OSM pontoknál
+            # ritkán van pont ugyanaz); ha az is messze van, inkább a hálózati geokódolás jön
+            best, best_gap = None, _HOUSE_NUMBER_MAX_GAP + 1
+            for r in rows:
+                hn_from, hn_to, parity = r[4], r[5], r[6]
+                if hn_from is None or (parity and house_number % 2 != parity % 2):
+                    continue
+                gap = max(hn_from - house_number, house_number - hn_to, 0)
+                if gap < best_gap:
+                    best, best_gap = r, gap
+            if best is None:
+                return None
+            return self._interpolate(best, min(max(house_number, best[4]), best[5]))
+
+        # házszám nélkül: az utca középpontja
+        return (sum(r[7] for r in rows) / len(rows), sum(r[8] for r in rows) / len(rows))
+
+    @staticmethod
+    def _interpolate(row: Tuple, house_number: int) -> Tuple[float, float]:
+        hn_from, hn_to, lat, lon, lat_to, lon_to = row[4], row[5], row[7], row[8], row[9], row[10]
+        if lat_to is None or lon_to is None or hn_to == hn_from:
+            return (lat, lon)
+        t = (house_number - hn_from) / (hn_to - hn_from)
+        return (lat + (lat_to - lat) * t, lon + (lon_to - lon) * t)
+
+    @staticmethod
+    def _lookup_area(conn: sqlite3.Connection, postal: Optional[str],
+                     words: List[str]) -> Optional[Tuple[float, float]]:
+        """Utca nélküli cím: irányítószám, majd település középpontja"""
+        if postal is not None:
+            row = conn.execute(
+                "SELECT AVG(lat), AVG(lon) FROM areas WHERE postal_code = ?", (postal,)
+            ).fetchone()
+            if row[0] is not None:
+                return (row[0], row[1])
+        if words:
+            row = conn.execute(
+                "SELECT AVG(lat), AVG(lon) FROM areas WHERE settlement = ?", (" ".join(words),)
+            ).fetchone()
+            if row[0] is not None:
+                return (row[0], row[1])
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._missing = False
+
+gazetteer = Gazetteer(GAZETTEER_DB)
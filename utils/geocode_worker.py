@@ -0,0 +1,87 @@
+# utils/geocode_worker.py
+import logging
+import threading
+from queue import Queue
+from typing import Optional, Tuple
+
+from config.settings import GEOCODE_RETRY_BASE_SECONDS, GEOCODE_RETRY_MAX_SECONDS, GEOCODE_RETRY_LIMIT
+from database.db_manager import db
+from utils.address_parser import parse_hungarian_address
+from utils.geocoding import geocode_address, GeocodeUnavailable
+
+logger = logging.getLogger(__name__)
+
+class GeocodeWorker:
+    """
+    Háttérszál, ami a beérkező rendelések (és a regisztrált éttermek) címét még a futár
+    kérése előtt geokódolja, és az eredményt az orders / groups táblába írja.
+    Csak valódi választ (találat vagy "nincs találat") ír; ha a geokódoló nem elérhető,
+    a sor NULL marad, és a tétel visszalépéssel újra sorba kerül.
+    """
+
+    def __init__(self) -> None:
+        # (fajta, azonosító, cím, próbálkozás) - fajta: "order" vagy "group"
+        self._queue: "Queue[Tuple[str, int, str, int]]" = Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+            self._thread.start()
+
+    def start(self) -> None:
+        """Szál indítása + a még nem geokódolt nyitott rendelések sorba állítása"""
+        self._ensure_running()
+        try:
+            for row in db.get_orders_missing_location():
+                self._queue.put(("order", row["id"], row["restaurant_address"], 1))
+        except Exception as e:
+            logger.error(f"Geocode backlog error: {e}")
+
+    def submit(self, order_id: int, address: str) -> None:
+        """Rendelés címének sorba állítása (nem blokkol)"""
+        if not address or not address.strip():
+            return
+        self._queue.put(("order", order_id, address, 1))
+        self._ensure_running()
+
+    def submit_group(self, group_id: int, address: str) -> None:
+        """Étterem (felvételi pont) címének sorba állítása"""
+        if not address or not address.strip():
+            return
+        self._queue.put(("group", group_id, address, 1))
+        self._ensure_running()
+
+    def _run(self) -> None:
+        while True:
+            kind, item_id, address, attempt = self._queue.get()
+            try:
+                coord = geocode_address(address, strict=True)
+                if kind == "group":
+                    db.set_group_location(item_id, coord)
+                else:
+                    db.set_order_location(item_id, parse_hungarian_address(address), coord)
+                logger.info(f"{kind} #{item_id} pre-geocoded: {coord}")
+            except GeocodeUnavailable as e:
+                self._retry_later(kind, item_id, address, attempt, e)
+            except Exception as e:
+                logger.error(f"Pre-geocoding failed for {kind} #{item_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _retry_later(self, kind: str, item_id: int, address: str, attempt: int, error: Exception) -> None:
+        """Átmeneti hiba: nem írunk semmit, a tétel visszalépés után újra sorba kerül"""
+        if attempt >= GEOCODE_RETRY_LIMIT:
+            logger.error(f"Giving up pre-geocoding {kind} #{item_id} after {attempt} attempts: {error}")
+            return
+        delay = min(GEOCODE_RETRY_MAX_SECONDS, GEOCODE_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        logger.warning(f"Geocoder unavailable for {kind} #{item_id}, retrying in {delay:.0f}s: {error}")
+        timer = threading.Timer(delay, self._queue.put, args=((kind, item_id, address, attempt + 1),))
+        timer.daemon = True
+        timer.start()
+
+# Globális háttér geokódoló
+geocode_worker = GeocodeWorker()
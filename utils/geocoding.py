@@ -3,41 +3,224 @@ import requests
 import math
 import time
 import logging
-from typing import List, Optional, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from requests.adapters import HTTPAdapter
+
+# Opcionális: NumPy-val a távolság mátrix egy vektorizált lépésben számolódik
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from config.settings import (
+    GEOCODE_CACHE_TTL_DAYS, GEOCODE_NEGATIVE_TTL_HOURS, GEOCODE_LRU_SIZE,
+    NOMINATIM_RPS, GEOCODE_MAX_WORKERS, NOMINATIM_MAX_ATTEMPTS, NOMINATIM_BACKOFF_BASE, NOMINATIM_BACKOFF_MAX
+)
+from database.db_manager import db
 from utils.address_parser import parse_hungarian_address
+from utils.gazetteer import gazetteer
+from utils.rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
-def geocode_address(address: str) -> Optional[Tuple[float, float]]:
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+# Közös keep-alive HTTP session és folyamat szintű Nominatim rate limit
+_session = requests.Session()
+_session.headers.update({'User-Agent': 'OPDBot/1.0 (Delivery Navigation)'})
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=GEOCODE_MAX_WORKERS))
+_nominatim_bucket = TokenBucket(rate=NOMINATIM_RPS, capacity=1)
+# 429 után a teljes folyamat szünetel eddig (monotonic idő) - minden szál tiszteletben tartja
+_pause_until = 0.0
+
+class GeocodeUnavailable(Exception):
+    """A geokódoló nem adott választ (hálózati hiba, 429, 5xx) - ez nem "nincs találat", később újra kell próbálni"""
+
+class _GeocodeLRU:
+    """Kis memória cache a perzisztens geocode_cache tábla előtt (lejárati idővel)"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[Optional[Tuple[float, float]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """(talált-e, koordináta) - a koordináta None lehet negatív találatnál"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            coord, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, coord
+
+    def put(self, key: str, coord: Optional[Tuple[float, float]]) -> None:
+        ttl = GEOCODE_CACHE_TTL_DAYS * 86400 if coord else GEOCODE_NEGATIVE_TTL_HOURS * 3600
+        with self._lock:
+            self._data[key] = (coord, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+_lru = _GeocodeLRU(GEOCODE_LRU_SIZE)
+
+def _cache_key(address: str) -> Tuple[str, str]:
+    """(Nominatim lekérdezés, cache kulcs) egy nyers címhez"""
+    parsed_addr = parse_hungarian_address(address)
+    return parsed_addr, parsed_addr.lower()
+
+def _lookup_cached(key: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+    """Memória LRU, majd SQLite geocode_cache; (talált-e, koordináta)"""
+    found, coord = _lru.get(key)
+    if found:
+        return True, coord
+
+    try:
+        cached = db.get_cached_geocode(key, GEOCODE_CACHE_TTL_DAYS, GEOCODE_NEGATIVE_TTL_HOURS)
+        if cached is not None:
+            coord = (cached["lat"], cached["lon"]) if cached["lat"] is not None else None
+            _lru.put(key, coord)
+            return True, coord
+    except Exception as e:
+        logger.error(f"Geocode cache read error for '{key}': {e}")
+    return False, None
+
+def _retry_after_seconds(response: requests.Response, attempt: int) -> float:
+    """Retry-After fejléc (másodperc), ha nincs vagy nem szám: exponenciális visszalépés"""
+    try:
+        wait = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        wait = NOMINATIM_BACKOFF_BASE * 2 ** (attempt - 1)
+    return min(max(wait, 0.0), NOMINATIM_BACKOFF_MAX)
+
+def _wait_for_pause() -> None:
+    delay = _pause_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+def _geocode_remote(parsed_addr: str, key: str) -> Optional[Tuple[float, float]]:
     """
-    Cím geokódolása Nominatim API-val
+    Nominatim lekérdezés a közös rate limit alatt; a valódi választ (találat vagy "nincs találat") cache-eli.
+    429-nél a Retry-After ideig, 5xx / hálózati hibánál visszalépéssel újrapróbál;
+    ha így sem jön válasz, GeocodeUnavailable-t dob (nem negatív találat).
     """
+    global _pause_until
+    params = {
+        'q': parsed_addr,
+        'format': 'json',
+        'limit': 1,
+        'countrycodes': 'hu',
+        'addressdetails': 1
+    }
+    error = ""
+    for attempt in range(1, NOMINATIM_MAX_ATTEMPTS + 1):
+        wait = NOMINATIM_BACKOFF_BASE * 2 ** (attempt - 1)
+        try:
+            _wait_for_pause()
+            _nominatim_bucket.acquire()  # Udvarias várakozás - az összes szálra együtt
+            response = _session.get(NOMINATIM_URL, params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                coord = None
+                if data and len(data) > 0:
+                    lat = float(data[0]['lat'])
+                    lon = float(data[0]['lon'])
+                    coord = (lat, lon)
+                # csak valódi válasz kerül cache-be (hálózati hiba nem lesz negatív találat)
+                _lru.put(key, coord)
+                db.save_geocode(key, coord)
+                return coord
+            error = f"HTTP {response.status_code}"
+            if response.status_code == 429:
+                wait = _retry_after_seconds(response, attempt)
+                _pause_until = max(_pause_until, time.monotonic() + wait)
+                logger.warning(f"Nominatim rate limited (429) for '{parsed_addr}', pausing {wait:.0f}s")
+            elif response.status_code >= 500:
+                logger.warning(f"Nominatim {error} for '{parsed_addr}' (attempt {attempt}/{NOMINATIM_MAX_ATTEMPTS})")
+            else:
+                # egyéb 4xx - újrapróbálni felesleges
+                logger.error(f"Nominatim {error} for '{parsed_addr}'")
+                break
+        except (requests.RequestException, ValueError) as e:
+            error = str(e)
+            logger.warning(f"Geocoding error for '{parsed_addr}' (attempt {attempt}/{NOMINATIM_MAX_ATTEMPTS}): {e}")
+        if attempt < NOMINATIM_MAX_ATTEMPTS:
+            time.sleep(min(wait, NOMINATIM_BACKOFF_MAX))
+    raise GeocodeUnavailable(f"{parsed_addr}: {error}")
+
+def geocode_address(address: str, strict: bool = False) -> Optional[Tuple[float, float]]:
+    """
+    Cím geokódolása: helyi gazetteer -> memória LRU -> SQLite geocode_cache -> Nominatim API.
+    A gazetteer a nyers címet kapja (a normalizált lekérdezésből az utca / házszám kieshet),
+    ezért a találata nem kerül a normalizált kulcsú cache-be.
+    Ha a geokódoló nem elérhető: `strict=True` esetén GeocodeUnavailable, különben None.
+    """
+    parsed_addr, key = _cache_key(address)
+    if not parsed_addr:
+        return None
+
+    coord = gazetteer.lookup(address)
+    if coord is not None:
+        return coord
+    found, coord = _lookup_cached(key)
+    if found:
+        return coord
+    if strict:
+        return _geocode_remote(parsed_addr, key)
+    return _geocode_remote_or_none(parsed_addr, key)
+
+def _geocode_remote_or_none(parsed_addr: str, key: str) -> Optional[Tuple[float, float]]:
+    """Mint _geocode_remote, de elérhetetlen geokódolónál None (útvonaltervezéshez elég)"""
     try:
-        time.sleep(0.5)  # Udvarias várakozás
-        
-        parsed_addr = parse_hungarian_address(address)
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': parsed_addr,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'hu',
-            'addressdetails': 1
-        }
-        headers = {
-            'User-Agent': 'OPDBot/1.0 (Delivery Navigation)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                lat = float(data[0]['lat'])
-                lon = float(data[0]['lon'])
-                return (lat, lon)
-    except Exception as e:
-        logger.error(f"Geocoding error for '{address}': {e}")
-    return None
+        return _geocode_remote(parsed_addr, key)
+    except GeocodeUnavailable as e:
+        logger.error(f"Geocoding unavailable: {e}")
+        return None
+
+def geocode_many(addresses: Iterable[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """
+    Több cím geokódolása egyszerre: azonos (normalizált) címek csak egyszer,
+    a cache-ben nem lévők párhuzamosan - a Nominatim keretet a közös rate limiter tartja.
+    Visszatérés: eredeti cím -> koordináta (vagy None).
+    """
+    by_key: Dict[str, List[str]] = {}
+    queries: Dict[str, str] = {}
+    result: Dict[str, Optional[Tuple[float, float]]] = {}
+
+    for addr in addresses:
+        parsed_addr, key = _cache_key(addr)
+        if not parsed_addr:
+            result[addr] = None
+            continue
+        local = gazetteer.lookup(addr)
+        if local is not None:
+            result[addr] = local
+            continue
+        by_key.setdefault(key, []).append(addr)
+        queries[key] = parsed_addr
+
+    missing = []
+    for key, originals in by_key.items():
+        found, coord = _lookup_cached(key)
+        if found:
+            for addr in originals:
+                result[addr] = coord
+        else:
+            missing.append(key)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(GEOCODE_MAX_WORKERS, len(missing))) as pool:
+            coords = pool.map(lambda k: _geocode_remote_or_none(queries[k], k), missing)
+            for key, coord in zip(missing, coords):
+                for addr in by_key[key]:
+                    result[addr] = coord
+
+    return result
 
 def haversine_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
@@ -61,51 +244,38 @@ def haversine_distance(coord1: Tuple[float, float], coord2: Tuple[float, float])
     
     return R * c
 
-def optimize_route(addresses: List[str]) -> List[str]:
+EARTH_RADIUS_KM = 6371.0
+
+def distance_matrix(coords: Sequence[Tuple[float, float]], as_array: bool = False):
     """
-    Egyszerű útvonal optimalizálás - legközelebbi szomszéd algoritmus
+    Összes pár haversine távolsága (km) egy lépésben: dist[i][j].
+    NumPy-val vektorizált, nélküle tiszta Python (pontonként egyszer számolt radián/koszinusz).
+    `as_array=True` esetén NumPy tömböt ad (ha elérhető), egyébként listák listáját.
     """
-    if len(addresses) <= 1:
-        return addresses
-    
-    # Maximum 6 cím (teljesítmény miatt)
-    if len(addresses) > 6:
-        logger.warning(f"Too many addresses ({len(addresses)}), limiting to 6")
-        addresses = addresses[:6]
-    
-    # Geokódolás
-    coords = []
-    valid_addresses = []
-    
-    for addr in addresses:
-        coord = geocode_address(addr)
-        if coord:
-            coords.append(coord)
-            valid_addresses.append(addr)
-        else:
-            logger.warning(f"Could not geocode address: {addr}")
-    
-    if len(valid_addresses) <= 1:
-        return valid_addresses
-    
-    # Legközelebbi szomszéd algoritmus
-    optimized = [valid_addresses[0]]  # Első cím
-    remaining = list(range(1, len(valid_addresses)))
-    current_coord = coords[0]
-    
-    while remaining:
-        min_distance = float('inf')
-        next_idx = remaining[0]
-        
-        for idx in remaining:
-            distance = haversine_distance(current_coord, coords[idx])
-            if distance < min_distance:
-                min_distance = distance
-                next_idx = idx
-        
-        optimized.append(valid_addresses[next_idx])
-        current_coord = coords[next_idx]
-        remaining.remove(next_idx)
-    
-    logger.info(f"Route optimized: {len(valid_addresses)} addresses")
-    return optimized
+    n = len(coords)
+    if n == 0:
+        return np.zeros((0, 0)) if (as_array and np is not None) else []
+
+    if np is not None:
+        rad = np.radians(np.asarray(coords, dtype=float))
+        lat = rad[:, 0][:, None]
+        lon = rad[:, 1][:, None]
+        a = (np.sin((lat.T - lat) / 2) ** 2
+             + np.cos(lat) * np.cos(lat.T) * np.sin((lon.T - lon) / 2) ** 2)
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        return dist if as_array else dist.tolist()
+
+    lats = [math.radians(c[0]) for c in coords]
+    lons = [math.radians(c[1]) for c in coords]
+    cos_lats = [math.cos(x) for x in lats]
+    dist = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lat1, lon1, cos1 = lats[i], lons[i], cos_lats[i]
+        row = dist[i]
+        for j in range(i + 1, n):
+            a = (math.sin((lats[j] - lat1) / 2) ** 2
+                 + cos1 * cos_lats[j] * math.sin((lons[j] - lon1) / 2) ** 2)
+            d = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+            row[j] = d
+            dist[j][i] = d
+    return dist
@@ -0,0 +1,54 @@
+# utils/json_fast.py
+import json
+from functools import lru_cache
+from json.encoder import encode_basestring
+from typing import Any, List, Sequence, Tuple
+
+# Opcionális gyors JSON backend - ha nincs telepítve, a beépített json modul marad
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any) -> bytes:
+    """Tetszőleges objektum JSON bájtokká kódolása"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+@lru_cache(maxsize=64)
+def _row_template(columns: Tuple[str, ...]) -> str:
+    """'{"id":%s,"status":%s,...}' - a kulcsok oszlopkészletenként egyszer kódolva"""
+    return "{" + ",".join(encode_basestring(c).replace("%", "%%") + ":%s" for c in columns) + "}"
+
+def _encode_value(value: Any) -> str:
+    """Nem szöveg / NULL / szám SQLite érték (ritka) - a beépített kódoló dönt"""
+    return json.dumps(value, ensure_ascii=False)
+
+def dumps_rows(columns: Sequence[str], rows: List[tuple]) -> bytes:
+    """
+    Tuple sorok kódolása objektumok JSON tömbjévé, közvetlenül bájtokba
+    (sqlite3.Row -> dict -> jsonify helyett egyetlen kódolási lépés).
+    orjson-nal a sor dict-ek C-ben kódolódnak (ez a leggyorsabb); nélküle nincs dict:
+    minden sor az oszlopkészlet előre kódolt kulcsaiból álló sablonba kerül.
+    """
+    if not rows:
+        return b"[]"
+    if orjson is not None:
+        return orjson.dumps([dict(zip(columns, r)) for r in rows])
+    template = _row_template(tuple(columns))
+    enc, other = encode_basestring, _encode_value
+    return ("[" + ",".join([
+        template % tuple([
+            enc(v) if v.__class__ is str else "null" if v is None
+            else repr(v) if v.__class__ is int else other(v)
+            for v in row
+        ])
+        for row in rows
+    ]) + "]").encode("utf-8")
+
+def wrap_rows(rows_json: bytes, **fields: Any) -> bytes:
+    """Előre kódolt sorlista beágyazása: {**fields, "orders": [...]}"""
+    head = dumps(fields)[:-1]
+    sep = b"," if len(head) > 1 else b""
+    return head + sep + b'"orders":' + rows_json + b"}"
@@ -0,0 +1,40 @@
+# utils/rate_limiter.py
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """
+    Szálbiztos token bucket: átlagosan `rate` művelet másodpercenként, legfeljebb `capacity` löketben.
+    Folyamaton belül közös - több Flask szál / háttérszál együtt sem lépi túl a keretet.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Egy token lefoglalása; visszaadja, mennyit kell várni, amíg a token ténylegesen 'megérkezik'"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Blokkoló várakozás a következő szabad tokenig"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Mint acquire, de az event loopot nem blokkolja"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,218 @@
+# utils/route_optimizer.py
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Távolság mátrix: dist[i][j] = i -> j távolság (szimmetrikus, km)
+Matrix = Sequence[Sequence[float]]
+
+HELD_KARP_MAX_STOPS = 12  # efölött a pontos DP túl lassú, helyi keresés jön
+
+def path_length(dist: Matrix, order: Sequence[int]) -> float:
+    """Nyitott útvonal hossza (nem tér vissza a kiindulóponthoz)"""
+    return sum(dist[a][b] for a, b in zip(order, order[1:]))
+
+def solve_path(dist: Matrix, start: Optional[int] = None, end: Optional[int] = None,
+               time_budget: float = 0.5,
+               precedence: Optional[Dict[int, Iterable[int]]] = None) -> List[int]:
+    """
+    Legrövidebb nyitott útvonal az összes ponton át (a pontok indexeinek sorrendje).
+    - legfeljebb HELD_KARP_MAX_STOPS pontig pontos Held-Karp dinamikus programozás
+    - efölött legközelebbi szomszéd + 2-opt / Or-opt helyi keresés `time_budget` másodpercig
+    `start` / `end` opcionálisan rögzíti az első / utolsó pontot.
+    `precedence[k]` azok a pontok, amelyeknek k előtt kell szerepelniük (pl. felvétel a leadás előtt).
+    """
+    n = len(dist)
+    required = [0] * n
+    for k, before in (precedence or {}).items():
+        for p in before:
+            required[k] |= 1 << p
+    if start is not None and required[start]:
+        raise ValueError("fixed start cannot have predecessors")
+
+    if n <= 1:
+        return list(range(n))
+    if start is not None and start == end:
+        raise ValueError("start and end must differ")
+    if n == 2:
+        order = [0, 1]
+        if start == 1 or end == 0 or required[0]:
+            order.reverse()
+        return order
+
+    if n <= HELD_KARP_MAX_STOPS:
+        return _held_karp(dist, start, end, required)
+
+    deadline = time.perf_counter() + time_budget
+    order = _nearest_neighbour(dist, start, end, required)
+    feasible = _precedence_check(required) if any(required) else None
+    return _local_search(dist, order, start is not None, end is not None, deadline, feasible)
+
+def _precedence_check(required: List[int]):
+    """Sorrend ellenőrző a helyi kereséshez: minden pont előfeltételei előtte vannak-e"""
+    def feasible(order: Sequence[int]) -> bool:
+        seen = 0
+        for node in order:
+            if required[node] & ~seen:
+                return False
+            seen |= 1 << node
+        return True
+    return feasible
+
+# =============== PONTOS MEGOLDÁS ===============
+def _held_karp(dist: Matrix, start: Optional[int], end: Optional[int],
+               required: List[int]) -> List[int]:
+    """Held-Karp: cost[mask][j] = legrövidebb út a `mask` pontjain át, `j`-ben végződve. O(2^n * n^2)"""
+    n = len(dist)
+    full = (1 << n) - 1
+    inf = float("inf")
+    cost = [[inf] * n for _ in range(1 << n)]
+    parent = [[-1] * n for _ in range(1 << n)]
+
+    for j in range(n):
+        if (start is None or j == start) and not required[j]:
+            cost[1 << j][j] = 0.0
+
+    for mask in range(1, full + 1):
+        row = cost[mask]
+        for j in range(n):
+            base = row[j]
+            if base == inf:
+                continue
+            dj = dist[j]
+            for k in range(n):
+                bit = 1 << k
+                if mask & bit or required[k] & ~mask:
+                    continue
+                # a rögzített végpont csak utolsóként kerülhet be
+                if k == end and (mask | bit) != full:
+                    continue
+                nxt = mask | bit
+                c = base + dj[k]
+                if c < cost[nxt][k]:
+                    cost[nxt][k] = c
+                    parent[nxt][k] = j
+
+    last = end if end is not None else min(range(n), key=lambda j: cost[full][j])
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        prev = parent[mask][last]
+        mask ^= 1 << last
+        last = prev
+    order.reverse()
+    return order
+
+# =============== HEURISZTIKA ===============
+def _nearest_neighbour(dist: Matrix, start: Optional[int], end: Optional[int],
+                       required: List[int]) -> List[int]:
+    """Kezdő megoldás: mohó legközelebbi szomszéd (a rögzített vég a sor végére kerül)"""
+    n = len(dist)
+    if start is not None:
+        current = start
+    else:
+        current = next(j for j in range(n) if not required[j] and j != end)
+    remaining = set(range(n))
+    remaining.discard(current)
+    if end is not None:
+        remaining.discard(end)
+
+    order = [current]
+    visited = 1 << current
+    while remaining:
+        row = dist[current]
+        # csak olyan pont jöhet, aminek az előfeltételei már megvannak
+        ready = [j for j in remaining if not required[j] & ~visited]
+        current = min(ready, key=row.__getitem__)
+        remaining.remove(current)
+        visited |= 1 << current
+        order.append(current)
+    if end is not None:
+        order.append(end)
+    return order
+
+def _local_search(dist: Matrix, order: List[int], fixed_start: bool, fixed_end: bool,
+                  deadline: float, feasible=None) -> List[int]:
+    """2-opt és Or-opt javítások felváltva, amíg van javulás és belefér az időkeretbe"""
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt(dist, order, fixed_start, fixed_end, deadline, feasible)
+        improved = _or_opt(dist, order, fixed_start, fixed_end, deadline, feasible) or improved
+    return order
+
+def _two_opt(dist: Matrix, order: List[int], fixed_start: bool, fixed_end: bool,
+             deadline: float, feasible=None) -> bool:
+    """order[i..k] szakasz megfordítása, ha rövidebb lesz tőle (helyben módosít)"""
+    n = len(order)
+    eps = 1e-9
+    improved = False
+    first = 1 if fixed_start else 0
+    last = n - 2 if fixed_end else n - 1
+
+    for i in range(first, last):
+        if time.perf_counter() >= deadline:
+            break
+        a = order[i - 1] if i > 0 else None
+        b = order[i]
+        for k in range(i + 1, last + 1):
+            c = order[k]
+            d = order[k + 1] if k + 1 < n else None
+            before = (dist[a][b] if a is not None else 0.0) + (dist[c][d] if d is not None else 0.0)
+            after = (dist[a][c] if a is not None else 0.0) + (dist[b][d] if d is not None else 0.0)
+            if after < before - eps:
+                candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                if feasible is not None and not feasible(candidate):
+                    continue
+                order[:] = candidate
+                b = order[i]
+                improved = True
+    return improved
+
+def _or_opt(dist: Matrix, order: List[int], fixed_start: bool, fixed_end: bool,
+            deadline: float, feasible=None) -> bool:
+    """1-3 hosszú szakasz áthelyezése (akár megfordítva) máshová az útvonalon"""
+    eps = 1e-9
+    improved = False
+
+    def d(x: Optional[int], y: Optional[int]) -> float:
+        return dist[x][y] if x is not None and y is not None else 0.0
+
+    for seg_len in (1, 2, 3):
+        i = 1 if fixed_start else 0
+        while i + seg_len <= len(order) - (1 if fixed_end else 0):
+            if time.perf_counter() >= deadline:
+                return improved
+            n = len(order)
+            seg = order[i:i + seg_len]
+            prev = order[i - 1] if i > 0 else None
+            nxt = order[i + seg_len] if i + seg_len < n else None
+            remove_gain = d(prev, seg[0]) + d(seg[-1], nxt) - d(prev, nxt)
+
+            rest = order[:i] + order[i + seg_len:]
+            best_delta, best_pos, best_rev = -eps, None, False
+            # beszúrás rest[pos-1] és rest[pos] közé
+            lo = 1 if fixed_start else 0
+            hi = len(rest) - 1 if fixed_end else len(rest)
+            for pos in range(lo, hi + 1):
+                if pos == i:
+                    continue  # eredeti hely
+                a = rest[pos - 1] if pos > 0 else None
+                b = rest[pos] if pos < len(rest) else None
+                base = d(a, b)
+                fwd = d(a, seg[0]) + d(seg[-1], b) - base - remove_gain
+                rev = d(a, seg[-1]) + d(seg[0], b) - base - remove_gain
+                if fwd < best_delta and (feasible is None or feasible(rest[:pos] + seg + rest[pos:])):
+                    best_delta, best_pos, best_rev = fwd, pos, False
+                if rev < best_delta and (feasible is None or feasible(rest[:pos] + seg[::-1] + rest[pos:])):
+                    best_delta, best_pos, best_rev = rev, pos, True
+
+            if best_pos is not None:
+                moved = seg[::-1] if best_rev else seg
+                order[:] = rest[:best_pos] + moved + rest[best_pos:]
+                improved = True
+            else:
+                i += 1
+    return improved
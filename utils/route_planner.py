@@ -0,0 +1,91 @@
+# utils/route_planner.py
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import ROUTE_TIME_BUDGET_SECONDS
+from utils.geocoding import distance_matrix, geocode_many
+from utils.route_optimizer import solve_path
+
+logger = logging.getLogger(__name__)
+
+def plan_pickup_delivery_route(orders: List[Dict],
+                               start: Optional[Tuple[float, float]] = None,
+                               time_budget: float = ROUTE_TIME_BUDGET_SECONDS) -> List[Dict]:
+    """
+    Felvétel + kiszállítás útvonal egy futár elfogadott és felvett rendeléseire
+    (db.get_partner_route_orders sorai).
+    - picked_up rendelés: csak leadási pont (a vevő címe)
+    - accepted rendelés: felvételi pont (étterem) + leadási pont; a felvétel mindig a leadás előtt
+    Egy étterem több rendelése egy felvételi megállóként szerepel.
+    Visszatérés: megállók sorrendben - {"type": "pickup"|"dropoff", "address", "name", "order_ids"}.
+    """
+    stops: List[Dict] = []
+    coords: List[Optional[Tuple[float, float]]] = []
+    pickup_of_group: Dict[int, int] = {}
+    precedence: Dict[int, List[int]] = {}
+
+    for o in orders:
+        address = (o.get("restaurant_address") or "").strip()
+        if not address:
+            continue
+
+        pickup_idx = None
+        if o.get("status") == "accepted":
+            pickup_idx = pickup_of_group.get(o["group_id"])
+            if pickup_idx is None and (o.get("pickup_address") or o.get("pickup_lat") is not None):
+                pickup_idx = len(stops)
+                pickup_of_group[o["group_id"]] = pickup_idx
+                stops.append({
+                    "type": "pickup",
+                    "address": o.get("pickup_address") or "",
+                    "name": o.get("group_name") or "",
+                    "order_ids": [],
+                })
+                coords.append((o["pickup_lat"], o["pickup_lon"]) if o.get("pickup_lat") is not None else None)
+            if pickup_idx is None:
+                logger.warning(f"No pickup location for group {o.get('group_id')} (order #{o['id']})")
+            else:
+                stops[pickup_idx]["order_ids"].append(o["id"])
+
+        drop_idx = len(stops)
+        stops.append({
+            "type": "dropoff",
+            "address": address,
+            "name": o.get("group_name") or "",
+            "order_ids": [o["id"]],
+        })
+        coords.append((o["lat"], o["lon"]) if o.get("lat") is not None else None)
+        if pickup_idx is not None:
+            precedence[drop_idx] = [pickup_idx]
+
+    # hiányzó koordináták egy kötegben (cache -> hálózat)
+    looked_up = geocode_many(s["address"] for s, c in zip(stops, coords) if c is None and s["address"])
+    coords = [c if c is not None else looked_up.get(s["address"]) for s, c in zip(stops, coords)]
+
+    # geokódolhatatlan megállók kihagyása; ha a felvétel esik ki, a leadás megkötés nélkül marad
+    keep = [i for i, c in enumerate(coords) if c]
+    for i, c in enumerate(coords):
+        if not c:
+            logger.warning(f"Could not geocode stop: {stops[i]['address']}")
+    new_index = {old: new for new, old in enumerate(keep)}
+    points = [coords[i] for i in keep]
+    kept_precedence = {
+        new_index[d]: [new_index[p] for p in before if p in new_index]
+        for d, before in precedence.items() if d in new_index
+    }
+
+    if not points:
+        return []
+
+    start_idx = None
+    if start is not None:
+        start_idx = len(points)
+        points.append(start)
+
+    dist = distance_matrix(points)
+    order = solve_path(dist, start=start_idx, time_budget=time_budget,
+                       precedence={k: v for k, v in kept_precedence.items() if v})
+    route = [stops[keep[i]] for i in order if i != start_idx]
+
+    logger.info(f"Pickup/delivery route planned: {len(route)} stops")
+    return route
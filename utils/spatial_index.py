@@ -0,0 +1,119 @@
+# utils/spatial_index.py
+import heapq
+import math
+import threading
+from typing import Any, Dict, Hashable, List, Set, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+_KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+class GridIndex:
+    """
+    Memóriabeli térbeli index: pontok rácscellákba (cell_deg fokos négyzetek) sorolva.
+    A keresés a ponttól kifelé, gyűrűnként járja be a cellákat (lásd nearest). Szálbiztos.
+    """
+
+    def __init__(self, cell_deg: float = 0.01) -> None:
+        self.cell_deg = cell_deg
+        self._points: Dict[Hashable, Tuple[float, float, Any]] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def put(self, key: Hashable, lat: float, lon: float, payload: Any = None) -> None:
+        """Pont beszúrása vagy áthelyezése"""
+        with self._lock:
+            self._discard(key)
+            self._points[key] = (lat, lon, payload)
+            self._cells.setdefault(self._cell(lat, lon), set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._points.clear()
+            self._cells.clear()
+
+    def _discard(self, key: Hashable) -> None:
+        old = self._points.pop(key, None)
+        if old is None:
+            return
+        cell = self._cell(old[0], old[1])
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self._cells[cell]
+
+    @staticmethod
+    def _ring(ci: int, cj: int, r: int):
+        """A (ci, cj) körüli r. gyűrű cellái (r=0: maga a cella)"""
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def nearest(self, lat: float, lon: float, radius_km: float, k: int) -> List[Tuple[float, Hashable, Any]]:
+        """
+        A `radius_km` sugáron belüli legközelebbi `k` pont: [(távolság km, kulcs, payload)], növekvő sorrendben.
+        A cellákat gyűrűnként járja be a ponttól kifelé, és megáll, amint k pont biztosan közelebb van
+        minden még be nem járt cellánál; ha több cellát kellene bejárni, mint amennyi létezik, mindent átnéz.
+        Rangsor síkbeli (equirectangular) közelítéssel - városi léptékben ezrelékes hiba -,
+        pontos haversine távolság csak a kiválasztott pontokra.
+        """
+        kx = _KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6)
+        limit = (radius_km * 1.01) ** 2
+        cell_km = self.cell_deg * min(_KM_PER_DEG_LAT, kx)
+        max_ring = math.ceil(radius_km / cell_km) + 1
+        found = []
+
+        def scan(points) -> None:
+            for key, (plat, plon, payload) in points:
+                dy = (plat - lat) * _KM_PER_DEG_LAT
+                dx = (plon - lon) * kx
+                d2 = dx * dx + dy * dy
+                if d2 <= limit:
+                    found.append((d2, key, plat, plon, payload))
+
+        with self._lock:
+            ci, cj = self._cell(lat, lon)
+            budget = len(self._cells)  # ennél több cella bejárása helyett olcsóbb mindent átnézni
+            for r in range(max_ring + 1):
+                budget -= 8 * r or 1
+                if budget < 0:
+                    found.clear()
+                    scan(self._points.items())
+                    break
+                for cell in self._ring(ci, cj, r):
+                    members = self._cells.get(cell)
+                    if members:
+                        scan((key, self._points[key]) for key in members)
+                # az r. gyűrűn túli cellák legalább r * cell_km távolságra vannak
+                covered = (r * cell_km) ** 2
+                if len(found) >= k and sum(1 for f in found if f[0] <= covered) >= k:
+                    break
+
+        result = []
+        for _, key, plat, plon, payload in heapq.nsmallest(k, found, key=lambda item: item[0]):
+            d = _haversine_km(lat, lon, plat, plon)
+            if d <= radius_km:
+                result.append((d, key, payload))
+        return result
@@ -1,11 +1,14 @@
 # web_app/app.py
-from flask import Flask, render_template_string
+import logging
+from flask import Flask, Response, request
 from flask_cors import CORS
 
 from web_app.routes.api_routes import api_bp
 from web_app.routes.admin_routes import admin_bp
-from web_app.templates.templates import HTML_TEMPLATE
-from database.db_manager import db
+from web_app.routes.telegram_routes import telegram_bp
+from web_app.templates.registry import init_templates, get_index_page
+
+logger = logging.getLogger(__name__)
 
 def create_app():
     """Flask alkalmazás létrehozása és konfigurálása"""
@@ -15,16 +18,21 @@ def create_app():
     # Blueprint-ek regisztrálása
     app.register_blueprint(api_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(telegram_bp)
+
+    # Sablonok fordítása egyszer, nem kérésenként
+    init_templates(app)
     
     @app.route("/")
     def index():
-        """Főoldal - futár felület"""
+        """Főoldal - futár felület (előrenderelt, ETag-gel)"""
         try:
-            orders = db.get_open_orders()
-            return render_template_string(HTML_TEMPLATE, orders=orders)
+            body, etag = get_index_page()
+            resp = Response(body, mimetype="text/html")
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp.make_conditional(request)
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"index error: {e}")
             return "error", 500
     
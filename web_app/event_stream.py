@@ -0,0 +1,72 @@
+# web_app/event_stream.py
+import logging
+import threading
+from queue import Queue, Empty, Full
+from typing import Dict, Optional, Set
+
+from config.settings import SSE_SUBSCRIBER_QUEUE
+from database.db_manager import db
+from utils.json_fast import dumps
+
+logger = logging.getLogger(__name__)
+
+# Ha egy kliens puffere betelt: eldobjuk a sorát, és jelezzük neki, hogy töltse újra a listát
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+class OrderEventBroker:
+    """Rendelés események szétosztása az összes csatlakozott futár SSE kapcsolatára"""
+
+    def __init__(self) -> None:
+        self._subscribers: Set["Queue[str]"] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> "Queue[str]":
+        q: "Queue[str]" = Queue(maxsize=SSE_SUBSCRIBER_QUEUE)
+        with self._lock:
+            self._subscribers.add(q)
+        logger.info(f"SSE subscriber connected ({len(self._subscribers)} active)")
+        return q
+
+    def unsubscribe(self, q: "Queue[str]") -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+        logger.info(f"SSE subscriber disconnected ({len(self._subscribers)} active)")
+
+    def publish(self, event: Dict) -> None:
+        """DatabaseManager listener: az esemény SSE üzenetként minden kliens sorába kerül"""
+        message = (
+            f"id: {event.get('version', '')}\n"
+            f"event: {event['type']}\n"
+            f"data: {dumps(event).decode('utf-8')}\n\n"
+        )
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except Full:
+                self._resync(q)
+
+    @staticmethod
+    def _resync(q: "Queue[str]") -> None:
+        while True:
+            try:
+                q.get_nowait()
+            except Empty:
+                break
+        try:
+            q.put_nowait(RESYNC_MESSAGE)
+        except Full:
+            pass
+
+    @staticmethod
+    def next_message(q: "Queue[str]", timeout: float) -> Optional[str]:
+        """Következő üzenet; None, ha `timeout` másodpercig nem jött semmi (heartbeat ideje)"""
+        try:
+            return q.get(timeout=timeout)
+        except Empty:
+            return None
+
+# Globális broker - a DatabaseManager írásai ide publikálnak
+order_events = OrderEventBroker()
+db.add_listener(order_events.publish)
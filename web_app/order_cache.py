@@ -0,0 +1,54 @@
+# web_app/order_cache.py
+import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, Tuple
+
+from database.db_manager import db
+
+@lru_cache(maxsize=1024)
+def _key_digest(key: Hashable) -> str:
+    """Cache kulcs rövid, folyamatok között is stabil lenyomata (a hash() sztringeknél futásonként más)"""
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+
+class OrderListCache:
+    """
+    Kódolt rendelés listák gyorsítótára a db.orders_version-höz kötve.
+    Amíg a verzió nem változik, a lista nem kérdezi az adatbázist és nem kódol újra JSON-t.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        # újraindítás után a verzió 0-ról indul - az ETag-ben a boot azonosító különbözteti meg
+        self._boot = f"{int(time.time()):x}{os.getpid():x}"
+
+    def etag(self, key: Hashable, version: int | None = None) -> str:
+        """
+        ETag egy listához az adott (alapból a jelenlegi) rendelés verziónál.
+        A kulcs lenyomata is benne van: azonos verziónál egy másik lista (vagy futár) ETag-je nem ad 304-et.
+        """
+        if version is None:
+            version = db.orders_version
+        return f"{self._boot}-{version}-{_key_digest(key)}"
+
+    def get(self, key: Hashable, loader: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """Kódolt lista és ETag; ha a tárolt bejegyzés elavult, a loader újratölti"""
+        # a verziót a lekérdezés ELŐTT olvassuk: közbeni írásnál a következő kérés újratölt
+        version = db.orders_version
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1], self.etag(key, version)
+
+        body = loader()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (version, body)
+        return body, self.etag(key, version)
+
+# Globális cache példány
+order_cache = OrderListCache()
@@ -0,0 +1,81 @@
+# web_app/pending_index.py
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import SPATIAL_CELL_DEG
+from database.db_manager import db
+from utils.spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+class PendingOrderIndex:
+    """
+    Az elérhető (pending) rendelések térbeli indexe a "közeli rendelések" API-hoz.
+    A rendelés helye a felvételi pont (az étterem koordinátája), mert a futár oda megy először;
+    ha az étterem még nincs geokódolva, a leadási cím (mint a kiosztási javaslatoknál).
+    Első használatkor az adatbázisból töltődik, utána a DatabaseManager eseményei tartják naprakészen
+    (létrehozás, geokódolás, elfogadás, étterem geokódolás).
+    """
+
+    def __init__(self) -> None:
+        self._grid = GridIndex(cell_deg=SPATIAL_CELL_DEG)
+        self._pickups: Dict[int, Tuple[float, float]] = {}  # csoport ID -> felvételi pont
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._pickups = db.get_group_locations()
+            for order in db.get_pending_located_orders():
+                self._place(order)
+            self._loaded = True
+            logger.info(f"Pending order index loaded ({len(self._grid)} orders)")
+
+    def _place(self, order: Dict) -> None:
+        """Rendelés be- / áthelyezése a felvételi pontjára; nem elérhető vagy hely nélküli -> ki"""
+        order_id = order.get("id")
+        pickup: Optional[Tuple[float, float]] = self._pickups.get(order.get("group_id"))
+        point = pickup or ((order["lat"], order["lon"]) if order.get("lat") is not None else None)
+        if order.get("status") != "pending" or point is None:
+            self._grid.remove(order_id)
+            return
+        order = {**order,
+                 "pickup_lat": pickup[0] if pickup else None,
+                 "pickup_lon": pickup[1] if pickup else None}
+        self._grid.put(order_id, point[0], point[1], order)
+
+    def on_event(self, event: Dict) -> None:
+        """DatabaseManager listener: rendelés események és étterem koordináta változás"""
+        with self._lock:
+            if not self._loaded:
+                return  # a betöltés úgyis az adatbázisból olvas
+            if event.get("type") == "group_located":
+                # a csoport összes elérhető rendelése (a hely nélküliek is) új pontra kerülhet:
+                # ritka esemény, a következő lekérdezés újratölti az indexet
+                self._grid.clear()
+                self._pickups = {}
+                self._loaded = False
+                return
+            order = event.get("order")
+            if order:
+                self._place(order)
+
+    def nearby(self, lat: float, lon: float, radius_km: float, k: int) -> List[Dict]:
+        """
+        A legközelebbi `k` elérhető rendelés `radius_km` sugáron belül, a felvételi ponttól mért
+        távolsággal (distance_km)
+        """
+        self._ensure_loaded()
+        return [
+            {**order, "distance_km": round(distance, 3)}
+            for distance, _, order in self._grid.nearest(lat, lon, radius_km, k)
+        ]
+
+# Globális index - a DatabaseManager írásai frissítik
+pending_index = PendingOrderIndex()
+db.add_listener(pending_index.on_event)
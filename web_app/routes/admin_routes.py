@@ -1,10 +1,10 @@
 # web_app/routes/admin_routes.py
 import logging
-from flask import Blueprint, request, render_template_string, jsonify
+from flask import Blueprint, Response, request, stream_with_context, jsonify
 
-from config.settings import ADMIN_USER_IDS
+from config.settings import ADMIN_USER_IDS, ADMIN_DELIVERIES_PAGE_SIZE
 from database.db_manager import db
-from web_app.templates.templates import ADMIN_HTML
+from web_app.templates.registry import get_template
 from web_app.routes.api_routes import validate_telegram_data
 
 logger = logging.getLogger(__name__)
@@ -20,15 +20,23 @@ def admin_page():
     if not user or user.get("id") not in ADMIN_USER_IDS:
         return "🚫 Hozzáférés megtagadva", 403
     
+    # keyset kurzor: az előző oldal utolsó sora (delivered_at, id)
+    before_at = request.args.get('before_at')
+    before_id = request.args.get('before_id', type=int)
+    before = (before_at, before_id) if before_at and before_id is not None else None
+
     try:
         weekly_courier = db.get_weekly_courier_stats()
         weekly_restaurant = db.get_weekly_restaurant_stats()
-        deliveries = db.get_recent_deliveries(500)
+        # generátor: a sorok kötegenként, a válasz írásával párhuzamosan jönnek az adatbázisból
+        deliveries = db.iter_deliveries(before, limit=ADMIN_DELIVERIES_PAGE_SIZE)
 
-        return render_template_string(ADMIN_HTML,
-                                      weekly_courier=weekly_courier,
-                                      weekly_restaurant=weekly_restaurant,
-                                      deliveries=deliveries)
+        page = get_template("admin").generate(weekly_courier=weekly_courier,
+                                              weekly_restaurant=weekly_restaurant,
+                                              deliveries=deliveries,
+                                              page_size=ADMIN_DELIVERIES_PAGE_SIZE,
+                                              init_data=init_data)
+        return Response(stream_with_context(page), mimetype="text/html")
     except Exception as e:
         logger.error(f"admin_page error: {e}")
         return "admin error", 500
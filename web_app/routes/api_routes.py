@@ -1,19 +1,47 @@
 # web_app/routes/api_routes.py
 import json
-import sqlite3
+import math
 import logging
 from typing import Dict, Optional
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from urllib.parse import unquote
+from telegram.helpers import escape_markdown
 
-from config.settings import notification_queue, DB_NAME
+from config.settings import (
+    SSE_HEARTBEAT_SECONDS,
+    NEARBY_DEFAULT_RADIUS_KM, NEARBY_MAX_RADIUS_KM, NEARBY_DEFAULT_LIMIT, NEARBY_MAX_LIMIT
+)
 from database.db_manager import db
-from utils.geocoding import optimize_route
+from utils.route_planner import plan_pickup_delivery_route
+from utils.json_fast import dumps, dumps_rows, wrap_rows
+from web_app.order_cache import order_cache
+from web_app.event_stream import order_events
+from web_app.pending_index import pending_index
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+def json_bytes_response(body: bytes, status: int = 200) -> Response:
+    """Előre kódolt JSON válasz (jsonify újrakódolása nélkül)"""
+    return Response(body, status=status, mimetype="application/json")
+
+def cached_orders_response(key, loader) -> Response:
+    """
+    Verzió alapú cache + ETag: változatlan rendeléseknél 304, adatbázis és JSON kódolás nélkül.
+    """
+    etag = order_cache.etag(key)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    body, etag = order_cache.get(key, loader)
+    resp = json_bytes_response(body)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
 def validate_telegram_data(init_data: str) -> Optional[Dict]:
     """Egyszerű dekódolás (HMAC ellenőrzés nélkül)."""
     try:
@@ -32,11 +60,30 @@ def validate_telegram_data(init_data: str) -> Optional[Dict]:
 def get_orders():
     """Összes aktív rendelés lekérése"""
     try:
-        return jsonify(db.get_open_orders())
+        return cached_orders_response(("open",), lambda: dumps_rows(*db.get_open_orders_rows()))
     except Exception as e:
         logger.error(f"api_orders error: {e}")
         return jsonify([])
 
+@api_bp.route("/stream")
+def order_stream():
+    """Élő rendelés feed (Server-Sent Events): order_created / order_status_changed + heartbeat"""
+    sub = order_events.subscribe()
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                message = order_events.next_message(sub, timeout=SSE_HEARTBEAT_SECONDS)
+                yield message if message is not None else ": ping\n\n"
+        finally:
+            order_events.unsubscribe(sub)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx/ngrok ne pufferelje
+    })
+
 @api_bp.route("/accept_order", methods=["POST"])
 def accept_order():
     """Rendelés elfogadása"""
@@ -49,36 +96,32 @@ def accept_order():
         if not user:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         
-        order = db.get_order_by_id(order_id)
-        if not order or order["status"] != "pending":
-            return jsonify({"ok": False, "error": "not_available"}), 400
-
         partner_name = ((user.get("first_name", "") + " " + user.get("last_name", ""))).strip()
         if not partner_name.strip():
             partner_name = str(user.get("id"))
         partner_username = user.get("username")
 
-        db.update_order_status(order_id, "accepted",
-                               partner_id=user.get("id"),
-                               partner_name=partner_name,
-                               partner_username=partner_username,
-                               estimated_time=eta)
+        # Értesítés az éttermi csoportnak - a státuszváltással egy tranzakcióban kerül az outboxba
+        # (a név / username Markdown-escape-elve: a `_` különben elrontaná a formázást)
+        partner_contact = f"@{partner_username}" if partner_username else partner_name
+        text = (
+            "🚚 **FUTÁR JELENTKEZETT!**\n\n"
+            f"👤 **Futár:** {escape_markdown(partner_name)}\n"
+            f"📱 **Kontakt:** {escape_markdown(partner_contact)}\n"
+            f"⏱️ **Becsült érkezés:** {eta} perc\n"
+            f"📋 **Rendelés ID:** #{order_id}\n"
+        )
 
-        # Értesítés az éttermi csoportnak
-        try:
-            partner_contact = f"@{partner_username}" if partner_username else partner_name
-            text = (
-                "🚚 **FUTÁR JELENTKEZETT!**\n\n"
-                f"👤 **Futár:** {partner_name}\n"
-                f"📱 **Kontakt:** {partner_contact}\n"
-                f"⏱️ **Becsült érkezés:** {eta} perc\n"
-                f"📋 **Rendelés ID:** #{order_id}\n"
-            )
-            notification_queue.put({"chat_id": order["group_id"], "text": text})
-            logger.info(f"Accept notification queued for group {order['group_id']}")
-
-        except Exception as e:
-            logger.error(f"group notify fail (accept): {e}")
+        # Feltételes UPDATE: ha két futár egyszerre kattint, csak az egyik nyer
+        order = db.transition_order(order_id, "pending", "accepted",
+                                    partner_id=user.get("id"),
+                                    partner_name=partner_name,
+                                    partner_username=partner_username,
+                                    estimated_time=eta,
+                                    notify_text=text)
+        if not order:
+            return jsonify({"ok": False, "error": "not_available"}), 400
+        logger.info(f"Accept notification queued for group {order['group_id']}")
 
         return jsonify({"ok": True})
     except Exception as e:
@@ -96,26 +139,21 @@ def pickup_order():
         if not user:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         
-        order = db.get_order_by_id(order_id)
-        if not order or order["status"] != "accepted":
-            return jsonify({"ok": False, "error": "not_accepted"}), 400
+        # Értesítés a csoportnak (outbox, a státuszváltással együtt)
+        partner_name = ((user.get("first_name", "") + " " + user.get("last_name", ""))).strip() or str(user.get("id"))
+        partner_username = user.get("username")
+        partner_contact = f"@{partner_username}" if partner_username else partner_name
+        text = (
+            "📦 **RENDELÉS FELVÉVE!**\n\n"
+            f"👤 **Futár:** {escape_markdown(partner_name)}\n"
+            f"📱 **Kontakt:** {escape_markdown(partner_contact)}\n"
+            f"📋 **Rendelés ID:** #{order_id}\n"
+        )
 
-        db.update_order_status(order_id, "picked_up", partner_id=user.get("id"))
-        
-        # Értesítés a csoportnak
-        try:
-            partner_name = ((user.get("first_name", "") + " " + user.get("last_name", ""))).strip() or str(user.get("id"))
-            partner_username = user.get("username")
-            partner_contact = f"@{partner_username}" if partner_username else partner_name
-            text = (
-                "📦 **RENDELÉS FELVÉVE!**\n\n"
-                f"👤 **Futár:** {partner_name}\n"
-                f"📱 **Kontakt:** {partner_contact}\n"
-                f"📋 **Rendelés ID:** #{order_id}\n"
-            )
-            notification_queue.put({"chat_id": order["group_id"], "text": text})
-        except Exception as e:
-            logger.error(f"group notify fail (pickup): {e}")
+        order = db.transition_order(order_id, "accepted", "picked_up", partner_id=user.get("id"),
+                                    notify_text=text)
+        if not order:
+            return jsonify({"ok": False, "error": "not_accepted"}), 400
 
         return jsonify({"ok": True})
     except Exception as e:
@@ -133,26 +171,20 @@ def mark_delivered():
         if not user:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         
-        order = db.get_order_by_id(order_id)
-        if not order or order["status"] != "picked_up":
-            return jsonify({"ok": False, "error": "not_pickup"}), 400
-
-        db.update_order_status(order_id, "delivered")
+        # Értesítés csoportnak (outbox, a státuszváltással együtt)
+        partner_name = ((user.get("first_name", "") + " " + user.get("last_name", ""))).strip() or str(user.get("id"))
+        partner_username = user.get("username")
+        partner_contact = f"@{partner_username}" if partner_username else partner_name
+        text = (
+            "✅ **RENDELÉS KISZÁLLÍTVA!**\n\n"
+            f"👤 **Futár:** {escape_markdown(partner_name)}\n"
+            f"📱 **Kontakt:** {escape_markdown(partner_contact)}\n"
+            f"📋 **Rendelés ID:** #{order_id}\n"
+        )
 
-        # Értesítés csoportnak
-        try:
-            partner_name = ((user.get("first_name", "") + " " + user.get("last_name", ""))).strip() or str(user.get("id"))
-            partner_username = user.get("username")
-            partner_contact = f"@{partner_username}" if partner_username else partner_name
-            text = (
-                "✅ **RENDELÉS KISZÁLLÍTVA!**\n\n"
-                f"👤 **Futár:** {partner_name}\n"
-                f"📱 **Kontakt:** {partner_contact}\n"
-                f"📋 **Rendelés ID:** #{order_id}\n"
-            )
-            notification_queue.put({"chat_id": order["group_id"], "text": text})
-        except Exception as e:
-            logger.error(f"group notify fail (delivered): {e}")
+        order = db.transition_order(order_id, "picked_up", "delivered", notify_text=text)
+        if not order:
+            return jsonify({"ok": False, "error": "not_pickup"}), 400
 
         return jsonify({"ok": True})
     except Exception as e:
@@ -168,39 +200,44 @@ def orders_by_status():
         
         if not status:
             return jsonify([])
-            
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        
+
         if status == "pending":
-            cur.execute("""
-                SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
-                       group_id, group_name, created_at, status
-                FROM orders WHERE status='pending' ORDER BY created_at DESC
-            """)
-            rows = [dict(r) for r in cur.fetchall()]
+            return cached_orders_response(("pending",), lambda: dumps_rows(*db.get_pending_orders_rows()))
         elif status in ("accepted", "picked_up", "delivered"):
             if not courier_id:
-                conn.close()
                 return jsonify({"ok": False, "error": "missing_courier"}), 400
-            cur.execute("""
-                SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
-                       group_id, group_name, created_at, status, estimated_time
-                FROM orders
-                WHERE status=? AND delivery_partner_id=?
-                ORDER BY created_at DESC
-            """, (status, courier_id))
-            rows = [dict(r) for r in cur.fetchall()]
-        else:
-            rows = []
-            
-        conn.close()
-        return jsonify(rows)
+            return cached_orders_response(
+                ("partner", courier_id, status),
+                lambda: dumps_rows(*db.get_partner_orders_rows(courier_id, status))
+            )
+
+        return jsonify([])
     except Exception as e:
         logger.error(f"api_orders_by_status error: {e}")
         return jsonify([]), 500
 
+@api_bp.route("/nearby_orders")
+def nearby_orders():
+    """Elérhető rendelések a megadott pont közelében, távolság szerint (?lat=&lon=&radius=&k=)"""
+    try:
+        lat = request.args.get("lat", type=float)
+        lon = request.args.get("lon", type=float)
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({"ok": False, "error": "missing_location"}), 400
+
+        radius = request.args.get("radius", NEARBY_DEFAULT_RADIUS_KM, type=float)
+        if not math.isfinite(radius):
+            return jsonify({"ok": False, "error": "invalid_radius"}), 400
+        radius = min(max(radius, 0.0), NEARBY_MAX_RADIUS_KM)
+        k = request.args.get("k", NEARBY_DEFAULT_LIMIT, type=int)
+        k = min(max(k, 1), NEARBY_MAX_LIMIT)
+
+        orders = pending_index.nearby(lat, lon, radius, k)
+        return json_bytes_response(dumps({"ok": True, "orders": orders, "count": len(orders)}))
+    except Exception as e:
+        logger.error(f"api_nearby_orders error: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
 @api_bp.route("/my_orders", methods=["POST"])
 def my_orders():
     """Saját rendelések lekérése"""
@@ -211,51 +248,40 @@ def my_orders():
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         
         status = data.get("status", "").strip()
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        
         if status not in ("accepted", "picked_up", "delivered"):
             return jsonify({"ok": True, "orders": []})
-        
-        cur.execute("""
-            SELECT id, restaurant_name, restaurant_address, phone_number, order_details,
-                   group_id, group_name, created_at, status, estimated_time
-            FROM orders
-            WHERE status=? AND delivery_partner_id=?
-            ORDER BY created_at DESC
-        """, (status, user["id"]))
-        
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return jsonify({"ok": True, "orders": rows})
+
+        return cached_orders_response(
+            ("my", user["id"], status),
+            lambda: wrap_rows(dumps_rows(*db.get_partner_orders_rows(user["id"], status)), ok=True)
+        )
     except Exception as e:
         logger.error(f"api_my_orders error: {e}")
         return jsonify({"ok": False, "error": str(e)}), 500
 
 @api_bp.route("/optimize_route", methods=["POST"])
 def optimize_route_api():
-    """Útvonal optimalizálás"""
+    """Útvonal optimalizálás: éttermi felvételek + kiszállítások egy sorrendben"""
     try:
         data = request.json or {}
         user = validate_telegram_data(data.get("initData", ""))
         if not user:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         
-        # Felvett rendelések lekérése
-        rows = db.get_partner_addresses(partner_id=user["id"], status="picked_up")
-        addresses = [r["restaurant_address"] for r in rows if r.get("restaurant_address") and r["restaurant_address"].strip()]
-        
-        if not addresses:
+        # Elfogadott (még felveendő) és felvett rendelések
+        rows = db.get_partner_route_orders(partner_id=user["id"])
+        if not any(r.get("restaurant_address") and r["restaurant_address"].strip() for r in rows):
             return jsonify({"ok": False, "error": "no_addresses"})
         
-        # Útvonal optimalizálás
-        optimized_addresses = optimize_route(addresses)
+        # Útvonal optimalizálás (felvétel mindig a hozzá tartozó leadás előtt)
+        stops = plan_pickup_delivery_route(rows)
+        addresses = [s["address"] for s in stops]
 
         return jsonify({
             "ok": True,
-            "addresses": optimized_addresses,
-            "count": len(optimized_addresses)
+            "addresses": addresses,
+            "stops": stops,
+            "count": len(addresses)
         })
         
     except Exception as e:
@@ -0,0 +1,31 @@
+# web_app/routes/telegram_routes.py
+import logging
+from flask import Blueprint, request, jsonify
+
+from config.settings import WEBHOOK_PATH
+from telegram_bot.webhook import webhook_bridge
+
+logger = logging.getLogger(__name__)
+
+telegram_bp = Blueprint('telegram', __name__)
+
+@telegram_bp.route(WEBHOOK_PATH, methods=["POST"])
+def telegram_webhook():
+    """Telegram webhook: update átadása a botnak (csak webhook módban, titkos tokennel)"""
+    if not webhook_bridge.active:
+        return jsonify({"ok": False, "error": "webhook_disabled"}), 404
+    if not webhook_bridge.verify(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        logger.warning(f"Webhook call with invalid secret from {request.remote_addr}")
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"ok": False, "error": "bad_request"}), 400
+    try:
+        if not webhook_bridge.feed(payload):
+            return jsonify({"ok": False, "error": "webhook_disabled"}), 503
+    except Exception as e:
+        # nem 2xx válasz esetén a Telegram később újraküldi az update-et
+        logger.error(f"telegram_webhook error: {e}")
+        return jsonify({"ok": False, "error": "internal"}), 500
+    return jsonify({"ok": True})
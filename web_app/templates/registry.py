@@ -0,0 +1,31 @@
+# web_app/templates/registry.py
+import hashlib
+from typing import Dict, Tuple
+from flask import Flask, current_app
+from jinja2 import Template
+
+from web_app.templates.templates import HTML_TEMPLATE, ADMIN_HTML
+
+# Sablon név -> Jinja forrás
+TEMPLATE_SOURCES: Dict[str, str] = {
+    "index": HTML_TEMPLATE,
+    "admin": ADMIN_HTML,
+}
+
+def init_templates(app: Flask) -> None:
+    """Sablonok egyszeri fordítása app létrehozáskor + a statikus futár felület előrenderelése"""
+    with app.app_context():
+        compiled = {name: app.jinja_env.from_string(src) for name, src in TEMPLATE_SOURCES.items()}
+        # a futár felület nem tartalmaz szerver oldali változót - elég egyszer renderelni
+        body = compiled["index"].render().encode("utf-8")
+
+    app.extensions["templates"] = compiled
+    app.extensions["index_page"] = (body, hashlib.sha1(body).hexdigest())
+
+def get_template(name: str) -> Template:
+    """Előre lefordított sablon lekérése"""
+    return current_app.extensions["templates"][name]
+
+def get_index_page() -> Tuple[bytes, str]:
+    """Előrenderelt futár felület (tartalom, ETag)"""
+    return current_app.extensions["index_page"]
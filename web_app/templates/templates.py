@@ -81,7 +81,7 @@ HTML_TEMPLATE = r"""
       <button class="tab" id="tab-dv" onclick="setTab('delivered')">Kiszállított</button>
     </div>
 
-    <!-- Navigációs gombok - csak Felvett menüben -->
+    <!-- Útvonal gombok - Elfogadott és Felvett menüben (felvétel + kiszállítás) -->
     <div class="routebar" id="routebar" style="display:none;">
       <button class="routebtn" onclick="openOptimizedRoute('google')">🗺️ Google Maps - Optimalizált útvonal</button>
       <button class="routebtn apple" onclick="openOptimizedRoute('apple')">🍎 Apple Maps - Optimalizált útvonal</button>
@@ -99,6 +99,7 @@ HTML_TEMPLATE = r"""
   
   const API = window.location.origin;
   let selectedETA = {}; // order_id -> 10/20/30
+  let myOrdersCache = {}; // tab -> {etag, orders} (my_orders ETag alapú újrahasznosítás)
   let TAB = (new URLSearchParams(location.search).get('tab')) || 'available';
 
   function ok(m){ 
@@ -190,8 +191,8 @@ HTML_TEMPLATE = r"""
     `;
   }
 
-  function wireTimeButtons(){
-    document.querySelectorAll('.time-btn').forEach(b=>{
+  function wireTimeButtons(root = document){
+    root.querySelectorAll('.time-btn').forEach(b=>{
       b.addEventListener('click', ()=>{
         const oid = b.dataset.oid, eta = b.dataset.eta;
         document.querySelectorAll(`[data-oid="${oid}"]`).forEach(x=>x.classList.remove('selected'));
@@ -209,8 +210,8 @@ HTML_TEMPLATE = r"""
     document.getElementById('tab-pk').classList.toggle('active', TAB==='picked_up');
     document.getElementById('tab-dv').classList.toggle('active', TAB==='delivered');
     
-    // Navigációs gombok megjelenítése csak Felvett menüben
-    document.getElementById('routebar').style.display = (TAB==='picked_up') ? 'flex' : 'none';
+    // Útvonal gombok: Elfogadott és Felvett menüben (éttermi felvételek + kiszállítások)
+    document.getElementById('routebar').style.display = (TAB==='accepted' || TAB==='picked_up') ? 'flex' : 'none';
 
     const list = document.getElementById('list');
     list.innerHTML = 'Betöltés…';
@@ -222,15 +223,25 @@ HTML_TEMPLATE = r"""
         if (!r.ok) throw new Error(`HTTP ${r.status}: ${r.statusText}`);
         data = await r.json();
       }else{
+        // POST-ot a böngésző nem cache-el: az ETag-et mi küldjük vissza, 304-nél a tárolt lista marad
+        const cached = myOrdersCache[TAB];
+        const headers = {'Content-Type':'application/json'};
+        if(cached) headers['If-None-Match'] = cached.etag;
         const r = await fetch(`${API}/api/my_orders`, {
           method:'POST', 
-          headers:{'Content-Type':'application/json'},
+          headers,
           body: JSON.stringify({ initData: tg?.initData || '', status: TAB })
         });
-        if (!r.ok) throw new Error(`HTTP ${r.status}: ${r.statusText}`);
-        const j = await r.json();
-        if(!j.ok) throw new Error(j.error||'Hálózati hiba');
-        data = j.orders || [];
+        if(r.status === 304 && cached){
+          data = cached.orders;
+        } else {
+          if (!r.ok) throw new Error(`HTTP ${r.status}: ${r.statusText}`);
+          const j = await r.json();
+          if(!j.ok) throw new Error(j.error||'Hálózati hiba');
+          data = j.orders || [];
+          const etag = r.headers.get('ETag');
+          if(etag) myOrdersCache[TAB] = { etag, orders: data };
+        }
       }
     }catch(e){
       console.error('Load error:', e);
@@ -337,7 +348,7 @@ HTML_TEMPLATE = r"""
       
       const addresses = j.addresses || [];
       if(addresses.length === 0){
-        err('Nincs felvett rendelés az útvonaltervezéshez');
+        err('Nincs elfogadott vagy felvett rendelés az útvonaltervezéshez');
         return;
       }
       
@@ -391,9 +402,56 @@ HTML_TEMPLATE = r"""
     load();
   }
 
-  // Kezdeti betöltés és automatikus frissítés
-  load();
-  setInterval(load, 30000); // 30 másodpercenként frissít
+  // Élő frissítés (SSE): új / státuszt váltott rendelések beillesztése a listába
+  const MY_ID = tg?.initDataUnsafe?.user?.id;
+  let liveFeed = false;
+
+  function applyOrderEvent(ev){
+    const o = ev.order || {};
+    const list = document.getElementById('list');
+    const card = document.getElementById(`card-${o.id}`);
+
+    // saját művelet: a doAction már frissítette a kártyát
+    if(card && MY_ID && o.delivery_partner_id === MY_ID) return;
+
+    if(TAB === 'available'){
+      if(o.status === 'pending' && !card){
+        if(!list.querySelector('.card')) list.innerHTML = '';
+        list.insertAdjacentHTML('afterbegin', render(o));
+        wireTimeButtons(document.getElementById(`card-${o.id}`));
+      } else if(o.status !== 'pending' && card){
+        card.remove();
+      }
+    } else if(!card && o.status === TAB && MY_ID && o.delivery_partner_id === MY_ID){
+      load(); // másik eszközön végzett saját művelet
+    } else if(card && o.status !== TAB){
+      card.remove();
+    }
+
+    if(!list.querySelector('.card')) list.innerHTML = '<div class="muted">Nincs rendelés.</div>';
+  }
+
+  function startLiveFeed(){
+    if(!window.EventSource) return;
+    const es = new EventSource(`${API}/api/stream`);
+    es.onopen = ()=>{
+      // újracsatlakozás után a kimaradt eseményeket egy teljes betöltés pótolja
+      if(!liveFeed && document.getElementById('list').dataset.loaded) load();
+      liveFeed = true;
+    };
+    es.onerror = ()=>{ liveFeed = false; };
+    const onEvent = e=>{
+      try{ applyOrderEvent(JSON.parse(e.data)); }catch(x){ console.error('Feed error:', x); }
+    };
+    es.addEventListener('order_created', onEvent);
+    es.addEventListener('order_status_changed', onEvent);
+    es.addEventListener('resync', ()=>load());
+  }
+
+  // Kezdeti betöltés; pollozás csak tartalékként, ha az élő feed nem működik
+  load().then(()=>{ document.getElementById('list').dataset.loaded = '1'; });
+  startLiveFeed();
+  setInterval(()=>{ if(!liveFeed) load(); }, 30000);
 </script>
 </body>
 </html>
@@ -434,6 +492,7 @@ ADMIN_HTML = """
   <h2>Részletes kézbesítések</h2>
   <table border="1">
     <tr><th>Dátum</th><th>Futár</th><th>Csoport</th><th>Cím</th><th>Idő (perc)</th></tr>
+    {% set page = namespace(last=None, count=0) %}
     {% for r in deliveries %}
     <tr>
       <td>{{ r.delivered_at }}</td>
@@ -442,8 +501,12 @@ ADMIN_HTML = """
       <td>{{ r.restaurant_address }}</td>
       <td>{{ r.min }}</td>
     </tr>
+    {% set page.last = r %}{% set page.count = page.count + 1 %}
     {% endfor %}
   </table>
+  {% if page.count >= page_size and page.last %}
+  <p><a href="?init_data={{ init_data|urlencode }}&before_at={{ page.last.delivered_at|urlencode }}&before_id={{ page.last.id }}">Régebbiek »</a></p>
+  {% endif %}
 </body>
 </html>
 """